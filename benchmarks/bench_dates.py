@@ -0,0 +1,48 @@
+import argparse
+import time
+
+import dateparser
+
+from parsers.dates import parse_date_with_dateparser, parse_news_date
+
+
+# Date texts as they look on the article pages of every source
+SAMPLES = {
+    "meduza": ["14:52, 17 апреля 2024", "09:05, 1 марта 2024", "23:10, 30 декабря 2023", ],
+    "tvrain": ["17 апреля 2024, 14:52", "1 марта, 09:05", "30 декабря 2023, 23:10", ],
+    "rt": ["17 апреля 2024, 14:52", "1 марта 2024, 09:05", "30 декабря 2023, 23:10", ],
+    "iz": ["17 апреля 2024, 14:52", "01.03.2024 09:05", "30 декабря 2023, 23:10", ],
+    "kp": ["17 апреля 2024 14:52", "1 марта 2024 09:05", "30 декабря 2023 23:10", ],
+}
+
+
+def measure(parse, texts, repeats):
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        for source, text in texts:
+            parse(text, source)
+    return (time.perf_counter() - start_time) / (repeats * len(texts)) * 1e6  # microseconds per call
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser(description="Micro-benchmark of the news date parsing")
+    args_parser.add_argument("-r", "--repeats", type=int, default=200, help="How many times every sample is parsed")
+    args = args_parser.parse_args()
+
+    texts = [(source, text) for source, source_texts in SAMPLES.items() for text in source_texts]
+    for source, text in texts:
+        expected, parsed = dateparser.parse(text, languages=["ru"]), parse_news_date(text, source)
+        if expected != parsed:
+            print(f"[Warning] {source} '{text}': dateparser {expected}, parse_news_date {parsed}")
+
+    dateparser_time = measure(lambda text, source: dateparser.parse(text), texts, args.repeats)
+    dateparser_ru_time = measure(lambda text, source: dateparser.parse(text, languages=["ru"]), texts, args.repeats)
+    patterns_time = measure(parse_news_date, texts, args.repeats)
+    parse_date_with_dateparser.cache_clear()
+    fallback_time = measure(lambda text, source: parse_date_with_dateparser(text), texts, args.repeats)
+
+    print(f"dateparser.parse:                {dateparser_time:10.1f} us/article")
+    print(f"dateparser.parse, languages=ru:  {dateparser_ru_time:10.1f} us/article")
+    print(f"parse_news_date:                 {patterns_time:10.1f} us/article "
+          f"(x{dateparser_time / patterns_time:.0f})")
+    print(f"memoized dateparser fallback:    {fallback_time:10.1f} us/article")
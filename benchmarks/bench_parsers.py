@@ -0,0 +1,155 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.fixture_server import FixtureServer
+from benchmarks.fixtures import SOURCES
+from parsers.cli import (add_fetch_arguments, configure_parser, finish_parser, get_source_metrics_path,
+                         open_result_sink, save_parse_result)
+from parsers.crawler import create_parsers, FORMATS
+from parsers.discovery import Discovery
+from parsers.parser import FetchBackend, Parser
+from parsers.parser_panorama import PanoramaParser
+
+
+def get_peak_rss() -> float:
+    # Peak resident memory of the process in MB, it never decreases, so the phases show how it grows
+    if resource is None:
+        return 0
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / 2 ** 20 if sys.platform == "darwin" else peak_rss / 2 ** 10
+
+
+def measure(run, count) -> Tuple[Any, Dict]:
+    start_time, start_cpu_time = time.perf_counter(), time.process_time()
+    result = run()
+    seconds = time.perf_counter() - start_time
+    articles_num = count(result)
+    return result, {
+        "articles": articles_num,
+        "seconds": round(seconds, 4),
+        "cpu_seconds": round(time.process_time() - start_cpu_time, 4),
+        "articles_per_second": round(articles_num / seconds, 2) if seconds else 0,
+        "peak_rss_mb": round(get_peak_rss(), 1),
+    }
+
+
+def create_benchmark_parser(source: str, base_url: str, args: argparse.Namespace) -> Parser:
+    # The first parser of the source (politics for Panorama) pointed to the fixture server without the rate limit
+    parser, _ = create_parsers(source, args.news_num)[0]
+    if isinstance(parser, PanoramaParser):
+        parser.SITE_URL = f"{base_url}/panorama"
+        parser.start_url = parser.get_current_news_page_link()
+    else:
+        parser.start_url = f"{base_url}/{source}/"
+        parser.DISCOVERY_FEEDS = [f"{base_url}/{source}/rss", ]
+    parser.DOMAIN_REQUEST_INTERVAL = 0
+    configure_parser(parser, args)
+    return parser
+
+
+def run_source_benchmark(source: str, base_url: str, args: argparse.Namespace) -> Dict[str, Dict]:
+    # Runs in a fresh process, so the CPU time and the peak memory belong to this source only
+    parser = create_benchmark_parser(source, base_url, args)
+    results = dict()
+    if parser.pipelined:
+        # The titles and the texts overlap, so they are measured together
+        parse_data, results["pipeline"] = measure(lambda: parser.parse(args.news_num), len)
+    else:
+        news_data, results["titles"] = measure(lambda: parser.parse_titles(args.news_num), len)
+        parse_data, results["texts"] = measure(lambda: parser.parse_texts(news_data), len)
+    first_page = parser.metrics.to_dict()["phases"].get("first_page")
+    results["pipeline" if parser.pipelined else "texts"]["first_page_seconds"] = \
+        round(first_page["seconds"], 4) if first_page is not None else None
+
+    def export_result():
+        output = os.path.join(args.output_dir, source if args.format == "dataset" else f"{source}.{args.format}")
+        result_sink = open_result_sink(output, source)
+        if result_sink is not None:
+            parse_data.stream_to(result_sink)
+        save_parse_result(parse_data, output, result_sink)
+        return parse_data
+
+    _, results["export"] = measure(export_result, len)
+    if args.metrics is not None:
+        args.metrics = get_source_metrics_path(args.metrics, source)
+    # The journal is removed, the metrics and the incremental state are saved as after a crawl
+    finish_parser(parser, parse_data, args)
+    return results
+
+
+def compare_results(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    regressions = []
+    for source, phases in results.items():
+        for phase, result in phases.items():
+            baseline_result = baseline.get(source, {}).get(phase)
+            if baseline_result is None or not baseline_result["articles_per_second"]:
+                continue
+            ratio = result["articles_per_second"] / baseline_result["articles_per_second"]
+            if ratio < 1 - tolerance:
+                regressions.append(f"{source} {phase}: {result['articles_per_second']} articles/s, "
+                                   f"baseline {baseline_result['articles_per_second']} ({ratio - 1:+.0%})")
+    return regressions
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser(
+        description="Offline benchmark of the parsers: titles, texts and export phases of every source against "
+                    "the local fixture server")
+    args_parser.add_argument("-s", "--sources", default=','.join(SOURCES),
+                             help=f"Comma separated list of sources (default: {','.join(SOURCES)})")
+    args_parser.add_argument("-n", "--news-num", type=int, default=200,
+                             help="How many news articles are parsed from every source")
+    args_parser.add_argument("-f", "--format", choices=FORMATS, default="parquet",
+                             help="Format of the export phase (default: parquet)")
+    args_parser.add_argument("--save", help="Save the results to the JSON file, e.g. as the baseline")
+    args_parser.add_argument("--baseline", help="JSON file of the previous results to compare with")
+    args_parser.add_argument("--tolerance", type=float, default=0.2,
+                             help="Allowed slowdown of articles/s against the baseline (default: 0.2)")
+    add_fetch_arguments(args_parser)
+    args = args_parser.parse_args()
+    if args.resume:
+        args_parser.error("--resume can't be used with the benchmark, every run starts with fresh checkpoints")
+    # Feeds and plain HTTP don't need a browser, the listing pages are replayed with "-d listing -b selenium"
+    if args.discovery is None:
+        args.discovery = Discovery.FEED
+    if args.fetch_backend is None:
+        args.fetch_backend = FetchBackend.HTTP
+
+    results = dict()
+    with tempfile.TemporaryDirectory() as output_dir, FixtureServer(args.news_num) as server:
+        args.output_dir = output_dir
+        args.checkpoint_dir = os.path.join(output_dir, "checkpoints")
+        for source in [source.strip() for source in args.sources.split(',') if source.strip()]:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                results[source] = executor.submit(run_source_benchmark, source, server.base_url, args).result()
+
+    print(f"\n{'source':<10}{'phase':<10}{'articles':>10}{'seconds':>10}{'cpu, s':>10}{'articles/s':>12}"
+          f"{'peak RSS, MB':>14}{'first page, s':>15}")
+    for source, phases in results.items():
+        for phase, result in phases.items():
+            first_page = result.get("first_page_seconds")
+            print(f"{source:<10}{phase:<10}{result['articles']:>10}{result['seconds']:>10.2f}"
+                  f"{result['cpu_seconds']:>10.2f}{result['articles_per_second']:>12.1f}{result['peak_rss_mb']:>14.1f}"
+                  f"{'' if first_page is None else f'{first_page:.2f}':>15}")
+
+    if args.save is not None:
+        with open(args.save, "w", encoding="utf-8") as results_file:
+            json.dump(results, results_file, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = compare_results(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"[Regression] {regression}")
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,103 @@
+import argparse
+import multiprocessing
+import re
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.fixtures import (get_archive_page, get_article_page, get_cards, get_feed, get_listing_page,
+                                 SOURCES)
+
+
+# Routes of the fixture server, every source lives under its own prefix:
+#   /<source>/                         listing page
+#   /<source>/cards?offset=<n>         cards loaded by the "More" click
+#   /<source>/rss                      RSS feed
+#   /<source>/news/<index>             article page
+#   /panorama/<category>/<dd-mm-yyyy>  Panorama date archive
+#   /status/<code>                     error answer with the status code, e.g. a block of the site
+LISTING_PATH = re.compile(r"^/(\w+)/$")
+CARDS_PATH = re.compile(r"^/(\w+)/cards$")
+FEED_PATH = re.compile(r"^/(\w+)/rss$")
+ARTICLE_PATH = re.compile(r"^/(\w+)/news/(\d+)$")
+ARCHIVE_PATH = re.compile(r"^/panorama/(\w+)/(\d\d-\d\d-\d{4})$")
+STATUS_PATH = re.compile(r"^/status/(\d{3})$")
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    news_num = 0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        base_url = f"http://{self.headers.get('Host')}"
+        if match := ARTICLE_PATH.match(url.path):
+            self.__send(get_article_page(match[1], int(match[2])) if match[1] in SOURCES else None)
+        elif match := ARCHIVE_PATH.match(url.path):
+            self.__send(get_archive_page(base_url, match[1], datetime.strptime(match[2], "%d-%m-%Y")))
+        elif (match := LISTING_PATH.match(url.path)) and match[1] in SOURCES:
+            self.__send(get_listing_page(base_url, match[1], self.news_num))
+        elif (match := CARDS_PATH.match(url.path)) and match[1] in SOURCES:
+            offset = int(parse_qs(url.query).get("offset", ["0"])[0])
+            self.__send(get_cards(base_url, match[1], offset, self.news_num))
+        elif (match := FEED_PATH.match(url.path)) and match[1] in SOURCES:
+            self.__send(get_feed(base_url, match[1], self.news_num), "application/rss+xml")
+        elif match := STATUS_PATH.match(url.path):
+            self.send_error(int(match[1]))
+        else:
+            self.__send(None)
+
+    def log_message(self, format, *args):
+        pass
+
+    def __send(self, body, content_type: str = "text/html"):
+        if body is None:
+            self.send_error(404)
+            return
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port: int, news_num: int, ports=None):
+    FixtureHandler.news_num = news_num
+    with ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler) as server:
+        if ports is not None:
+            ports.put(server.server_address[1])
+        server.serve_forever()
+
+
+# The server runs in its own process, so its CPU time and memory are not counted in the measurements of the parsers
+class FixtureServer:
+    def __init__(self, news_num: int, port: int = 0):
+        self.news_num = news_num
+        self.port = port
+        self.__process = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "FixtureServer":
+        ports = multiprocessing.Queue()
+        self.__process = multiprocessing.Process(target=serve, args=(self.port, self.news_num, ports), daemon=True)
+        self.__process.start()
+        self.port = ports.get(timeout=10)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.__process.terminate()
+        self.__process.join()
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser(description="Local server of the benchmark pages of all sources")
+    args_parser.add_argument("-p", "--port", type=int, default=8765)
+    args_parser.add_argument("-n", "--news-num", type=int, default=1000,
+                             help="How many news are in the listings and feeds of every source")
+    args = args_parser.parse_args()
+
+    print(f"[FixtureServer] Serving http://127.0.0.1:{args.port}/<source>/ for {', '.join(SOURCES)} ...")
+    serve(args.port, args.news_num)
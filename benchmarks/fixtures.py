@@ -0,0 +1,181 @@
+import random
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from html import escape
+from typing import List
+
+
+# Pages of every source as the parsers see them: listing pages with the "More" controls, RSS feeds, Panorama date
+# archives and article pages. They are generated from the selectors of the parsers, so the same news number
+# gives the same pages on every run and every machine.
+SOURCES = ["meduza", "tvrain", "panorama", "rt", "iz", "kp", ]
+PAGE_SIZE = 20  # cards on the listing page and after every "More" click
+ARCHIVE_NEWS_NUM = 20  # news of one Panorama day
+PARAGRAPHS_NUM = (4, 12)
+PARAGRAPH_WORDS_NUM = (30, 90)
+LAST_NEWS_DATE = datetime(2024, 4, 17, 23, 50)
+NEWS_INTERVAL = timedelta(minutes=15)
+MOSCOW_TIMEZONE = timezone(timedelta(hours=3))
+
+WORDS = ["правительство", "заявил", "министр", "россия", "москва", "президент", "выборы", "экономика", "рубль",
+         "доллар", "нефть", "санкции", "суд", "депутат", "закон", "бюджет", "регион", "город", "жители", "власти",
+         "полиция", "решение", "проект", "компания", "рынок", "цены", "рост", "снижение", "сообщил", "источник",
+         "агентство", "данные", "эксперты", "аналитики", "неделя", "месяц", "год", "вторник", "среда", "пятница",
+         "школа", "университет", "больница", "врачи", "погода", "снег", "дождь", "дорога", "транспорт", "метро",
+         "в", "на", "по", "с", "и", "что", "как", "для", "после", "до", "из", "о", "при", "не", "это", "также"]
+MONTHS = ["января", "февраля", "марта", "апреля", "мая", "июня", "июля", "августа", "сентября", "октября",
+          "ноября", "декабря", ]
+TAGS = ["Политика", "Экономика", "Общество", "Мир", "Спорт", "Культура", ]
+
+CARDS = {
+    "meduza": '<a class="ChronologyItem-module-link" href="{link}"><div class="ChronologyItem-module-body">'
+              '<strong>{title}</strong><span>{subtitle}</span></div></a>',
+    "tvrain": '<div class="newsline_tile__headTitle"><a href="{link}">{title}</a></div>',
+    "rt": '<div class="card card_all-news"><div class="card__heading"><a class="link" href="{link}">{title}</a></div>'
+          '<div class="card__summary">{subtitle}</div><div class="card__category">{tag}</div></div>',
+    "iz": '<div class="node__cart__item"><a class="node__cart__item__inside" href="{link}">'
+          '<div class="node__cart__item__inside__info__title">{title}</div></a>'
+          '<div class="node__cart__item__category_news">{tag}</div></div>',
+    "kp": '<div class="sc-1tputnk-13"><a class="sc-1tputnk-2" href="{link}">{title}</a>'
+          '<div class="sc-1tputnk-3">{subtitle}</div><div class="sc-1tputnk-11">{tag}</div></div>',
+}
+
+# Controls of the listing pages: clicked before the listing, "More" button (scroll for Izvestia) and footer
+LISTING_CONTROLS = {
+    "meduza": ('<button class="Switcher-module_control__60WMX">Лента</button>',
+               '<button class="Button-module_root__9OQ5b" onclick="loadMore()">Показать еще</button>',
+               '<div class="Footer-module-copyright">Meduza</div>'),
+    "tvrain": ('', '<button class="button--outline" onclick="loadMore()">Показать еще</button>',
+               '<div class="footer-copy">Дождь</div>'),
+    "rt": ('<div class="Popup-telegram"><button class="Popup-telegram__close">x</button></div>'
+           '<a href="javascript:void(0)">Подтвердить</a>',
+           '<a href="javascript:void(0)" onclick="loadMore()">Загрузить ещё</a>',
+           '<a class="footer__nav-link_rt-shop" href="javascript:void(0)">Магазин</a>'),
+    "iz": ('', '<script>window.addEventListener("scroll", () => {'
+               'if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 100) loadMore();});</script>',
+           '<div class="footer">Известия</div>'),
+    "kp": ('', '<button class="sc-abxysl-0" onclick="loadMore()">Показать еще</button>',
+           '<div class="footer">КП</div>'),
+}
+
+ARTICLES = {
+    "meduza": '<div class="GeneralMaterial-module-article"><h1>{title}</h1>{paragraphs}</div><time>{date}</time>',
+    "tvrain": '<div class="document-head__date">{date}</div><h1>{title}</h1><div class="document-lead">{lead}</div>'
+              '<div class="article-full__text">{paragraphs}</div>',
+    "panorama": '<h1>{title}</h1><div class="entry-contents pr-0">{paragraphs}</div>',
+    "rt": '<div class="date">{date}</div><h1>{title}</h1><div class="article__text">{paragraphs}</div>',
+    "iz": '<div class="article_page__left__top__time__label">{date}</div><h1>{title}</h1>'
+          '<div class="text-article__inside">{paragraphs}</div>',
+    "kp": '<div class="sc-j7em19-1">{date}</div><h1>{title}</h1><div class="sc-14f2vgk-1">{paragraphs}</div>',
+}
+PARAGRAPH = {
+    "meduza": '<p class="SimpleBlock-module_p__7aRnT ">{text}</p>',
+}
+
+LISTING_SCRIPT = """
+var loaded = {loaded}, loading = false;
+function loadMore() {{
+    if (loading || loaded >= {news_num}) {{
+        return;
+    }}
+    loading = true;
+    fetch("cards?offset=" + loaded).then(response => response.text()).then(html => {{
+        document.getElementById("cards").insertAdjacentHTML("beforeend", html);
+        loaded += {page_size};
+        loading = false;
+    }});
+}}
+"""
+
+
+def get_news_date(index: int) -> datetime:
+    return LAST_NEWS_DATE - NEWS_INTERVAL * index
+
+
+def get_sentence(generator: random.Random, words_num: int) -> str:
+    sentence = ' '.join(generator.choice(WORDS) for _ in range(words_num))
+    return sentence[0].upper() + sentence[1:]
+
+
+def get_paragraphs(index: int) -> List[str]:
+    generator = random.Random(index)
+    return [get_sentence(generator, generator.randint(*PARAGRAPH_WORDS_NUM)) + '.'
+            for _ in range(generator.randint(*PARAGRAPHS_NUM))]
+
+
+def get_title(index: int) -> str:
+    return f"{get_sentence(random.Random(-index - 1), 6)} №{index}"
+
+
+def get_subtitle(index: int) -> str:
+    return get_sentence(random.Random(-index - 1), 12)
+
+
+def format_date(source: str, date: datetime) -> str:
+    day = f"{date.day} {MONTHS[date.month - 1]} {date.year}"
+    if source == "meduza":
+        return f"{date:%H:%M}, {day}"
+    if source == "kp":
+        return f"{day} {date:%H:%M}"
+    return f"{day}, {date:%H:%M}"
+
+
+def get_news_link(base_url: str, source: str, index: int) -> str:
+    return f"{base_url}/{source}/news/{index}"
+
+
+def get_page(title: str, body: str) -> str:
+    return (f'<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8"><title>{escape(title)}</title></head>'
+            f'<body>{body}</body></html>')
+
+
+def get_article_page(source: str, index: int) -> str:
+    paragraph = PARAGRAPH.get(source, '<p>{text}</p>')
+    paragraphs = ''.join(paragraph.format(text=escape(text)) for text in get_paragraphs(index))
+    title = get_title(index)
+    return get_page(title, ARTICLES[source].format(title=escape(title), lead=escape(get_subtitle(index)),
+                                                   paragraphs=paragraphs,
+                                                   date=format_date(source, get_news_date(index))))
+
+
+def get_cards(base_url: str, source: str, offset: int, news_num: int) -> str:
+    return ''.join(CARDS[source].format(link=get_news_link(base_url, source, index), title=escape(get_title(index)),
+                                        subtitle=escape(get_subtitle(index)), tag=TAGS[index % len(TAGS)])
+                   for index in range(offset, min(offset + PAGE_SIZE, news_num)))
+
+
+def get_listing_page(base_url: str, source: str, news_num: int) -> str:
+    # The page grows by PAGE_SIZE cards after every "More" click, the spacer keeps the footer below the screen
+    before_listing, load_more, footer = LISTING_CONTROLS[source]
+    script = LISTING_SCRIPT.format(loaded=min(PAGE_SIZE, news_num), news_num=news_num, page_size=PAGE_SIZE)
+    return get_page(source, f'<script>{script}</script>{before_listing}'
+                            f'<div id="cards">{get_cards(base_url, source, 0, news_num)}</div>'
+                            f'<div style="height: 2000px"></div>{load_more}{footer}')
+
+
+def get_feed(base_url: str, source: str, news_num: int) -> str:
+    items = []
+    for index in range(news_num):
+        items.append(f"<item><title>{escape(get_title(index))}</title>"
+                     f"<link>{get_news_link(base_url, source, index)}</link>"
+                     f"<description>{escape(get_subtitle(index))}</description>"
+                     f"<category>{TAGS[index % len(TAGS)]}</category>"
+                     f"<pubDate>{format_datetime(get_news_date(index).replace(tzinfo=MOSCOW_TIMEZONE))}</pubDate>"
+                     f"</item>")
+    return (f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel><title>{source}</title>'
+            f'<link>{base_url}/{source}/</link>{"".join(items)}</channel></rss>')
+
+
+def get_archive_index(day: datetime, number: int) -> int:
+    # Every day of the archive has its own articles
+    return day.toordinal() * ARCHIVE_NEWS_NUM + number
+
+
+def get_archive_page(base_url: str, category: str, day: datetime) -> str:
+    cards = []
+    for number in range(ARCHIVE_NEWS_NUM):
+        index = get_archive_index(day, number)
+        cards.append(f'<a class="flex flex-col rounded-md mb-2" href="/panorama/news/{index}">'
+                     f'<div>{category}</div><div>{get_news_date(number):%H:%M}</div>'
+                     f'<div>{escape(get_title(index))}</div></a>')
+    return get_page(f"{category} {day:%d-%m-%Y}", ''.join(cards))
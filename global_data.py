@@ -1 +1,4 @@
-CHROMEDRIVER_BIN = r"C:\Users\ranru\Documents\FinalProject\chromedriver-win64\chromedriver.exe"
+import os
+
+# Path to chromedriver, without it the Selenium Manager finds or downloads the driver matching the installed Chrome
+CHROMEDRIVER_BIN = os.environ.get("CHROMEDRIVER_BIN")
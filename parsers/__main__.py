@@ -0,0 +1,180 @@
+import argparse
+import os
+import time
+from typing import List
+
+from parsers.cli import add_fetch_arguments
+from parsers.crawler import FORMATS, SOURCES
+from parsers.frontier import FrontierServer, open_frontier, SqliteFrontier
+from parsers.jobs import JobSpec, run_job, SourceJob
+from parsers.parser import host_rate_limiter, HostRateLimiter
+from parsers.reextract import reextract
+from parsers.workers import BATCH_SIZE, export_frontier, run_worker, seed_frontier
+
+
+JOB_ARGUMENTS = {"command", "spec", "sources", "per_source", "out", "format", "processes", }
+
+
+def add_crawl_arguments(args_parser: argparse.ArgumentParser):
+    args_parser.add_argument("--spec",
+                             help="Job spec JSON file, the arguments below override its values")
+    args_parser.add_argument("-s", "--sources",
+                             help=f"Comma separated list of sources (default: {','.join(SOURCES)})")
+    args_parser.add_argument("-n", "--per-source", type=int,
+                             help="How many fresh news articles do you want to parse from each source?")
+    args_parser.add_argument("-o", "--out",
+                             help="Output directory, the dataset format merges all sources into one dataset "
+                                  "partitioned by source and day, the other formats are saved to <source>.<format>")
+    args_parser.add_argument("-f", "--format", choices=FORMATS,
+                             help="Output files format (default: dataset)")
+    args_parser.add_argument("-p", "--processes", type=int,
+                             help="How many sources are parsed at the same time (default: all of them)")
+    add_fetch_arguments(args_parser)
+    args_parser.add_argument("-c", "--max-connections", type=int, default=HostRateLimiter.CONNECTIONS_LIMIT,
+                             help="How many news pages of one source can be loaded at the same time")
+    # Only the fetch arguments given on the command line get into the namespace, so they override the spec even
+    # when they are equal to the defaults. The defaults are applied by the source jobs.
+    for action in args_parser._actions:
+        if action.dest not in JOB_ARGUMENTS:
+            action.default = argparse.SUPPRESS
+
+
+def add_reextract_arguments(args_parser: argparse.ArgumentParser):
+    args_parser.add_argument("-a", "--archive", required=True,
+                             help="Page archive written by the crawls with --page-archive")
+    args_parser.add_argument("-s", "--sources", default=','.join(SOURCES),
+                             help=f"Comma separated list of sources (default: {','.join(SOURCES)})")
+    args_parser.add_argument("-o", "--out", required=True,
+                             help="Output directory, the same layout as of the crawl command")
+    args_parser.add_argument("-f", "--format", choices=FORMATS, default="dataset",
+                             help="Output files format (default: dataset)")
+    args_parser.add_argument("-p", "--processes", type=int, default=os.cpu_count(),
+                             help="How many processes extract the news at the same time (default: all CPUs)")
+
+
+def add_frontier_arguments(args_parser: argparse.ArgumentParser):
+    frontier_commands = args_parser.add_subparsers(dest="frontier_command", required=True)
+    serve_parser = frontier_commands.add_parser("serve", help="Share the SQLite frontier of this host over HTTP")
+    serve_parser.add_argument("--frontier", required=True, help="Path to the SQLite frontier")
+    serve_parser.add_argument("--host", default="127.0.0.1",
+                              help="Address to listen on (default: 127.0.0.1), serve the workers of the other hosts "
+                                   "only with a token")
+    serve_parser.add_argument("--port", type=int, default=8780)
+    serve_parser.add_argument("--lease-timeout", type=float, default=SqliteFrontier.LEASE_TIMEOUT,
+                              help="Seconds a worker holds the claimed news before they are claimed by another one")
+
+    seed_parser = frontier_commands.add_parser("seed", help="Find the fresh news and add them to the frontier")
+    seed_parser.add_argument("-n", "--per-source", type=int, required=True,
+                             help="How many fresh news articles do you want to parse from each source?")
+    work_parser = frontier_commands.add_parser("work", help="Load the news of the frontier until all are done")
+    work_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                             help=f"How many news are claimed at once (default: {BATCH_SIZE})")
+    work_parser.add_argument("-c", "--max-connections", type=int, default=HostRateLimiter.CONNECTIONS_LIMIT,
+                             help="How many news pages of one source can be loaded at the same time")
+    export_parser = frontier_commands.add_parser("export", help="Save the committed news of the frontier")
+    export_parser.add_argument("-o", "--out", required=True,
+                               help="Output directory, the same layout as of the crawl command")
+    export_parser.add_argument("-f", "--format", choices=FORMATS, default="dataset",
+                               help="Output files format (default: dataset)")
+    for command_parser in [seed_parser, work_parser, export_parser]:
+        command_parser.add_argument("--frontier", required=True,
+                                    help="URL of the frontier server or path to the SQLite frontier of this host")
+        command_parser.add_argument("-s", "--sources", default=','.join(SOURCES),
+                                    help=f"Comma separated list of sources (default: {','.join(SOURCES)})")
+    for command_parser in [serve_parser, seed_parser, work_parser, export_parser]:
+        command_parser.add_argument("--token", default=os.environ.get("FRONTIER_TOKEN"),
+                                    help="Shared secret of the frontier server and its workers (default: the "
+                                         "FRONTIER_TOKEN environment variable)")
+    for command_parser in [seed_parser, work_parser]:
+        add_fetch_arguments(command_parser)
+
+
+def get_sources(value: str) -> List[str]:
+    sources = [source.strip() for source in value.split(',') if source.strip()]
+    for source in sources:
+        if source not in SOURCES:
+            raise ValueError(f"Unknown source {source}! Please use one of: {', '.join(SOURCES)}")
+    return sources
+
+
+def run_frontier_command(args: argparse.Namespace, args_parser: argparse.ArgumentParser):
+    if args.frontier_command == "serve":
+        if args.token is None and args.host not in ("127.0.0.1", "localhost", "::1"):
+            print(f"[FrontierServer][Warning] {args.host} is served without a token, anyone reaching it can "
+                  f"claim and commit the news")
+        frontier = SqliteFrontier(args.frontier, args.lease_timeout)
+        with FrontierServer(frontier, args.host, args.port, args.token) as server:
+            print(f"[FrontierServer] Serving {args.frontier} on {server.url} ...")
+            server.serve_forever()
+        return
+    if args.frontier_command in ("seed", "work") and (args.incremental is not None or args.resume or args.pipeline):
+        # The frontier itself keeps which news are found and loaded
+        args_parser.error("--incremental, --resume and --pipeline can't be used with the frontier commands")
+    frontier = open_frontier(args.frontier, args.token)
+    start_time = time.monotonic()
+    try:
+        for source in get_sources(args.sources):
+            if args.frontier_command == "seed":
+                news_num = seed_frontier(frontier, source, args.per_source, args)
+                print(f"[Frontier] {source}: {news_num} news added")
+            elif args.frontier_command == "work":
+                host_rate_limiter.set_connections_limit(args.max_connections)
+                news_num = run_worker(frontier, source, args, args.batch_size)
+                print(f"[Frontier] {source}: {news_num} news committed in {time.monotonic() - start_time:.0f} s")
+            elif args.frontier_command == "export":
+                output = args.out if args.format == "dataset" else os.path.join(args.out, f"{source}.{args.format}")
+                os.makedirs(args.out, exist_ok=True)
+                print(f"[Frontier] {source}: {len(export_frontier(frontier, source, output))} news exported")
+    finally:
+        frontier.close()
+
+
+def create_job_spec(args: argparse.Namespace) -> JobSpec:
+    spec = JobSpec.load(args.spec) if args.spec is not None else JobSpec.from_dict(dict())
+    if args.per_source is not None:
+        spec.per_source = args.per_source
+        for job in spec.jobs:
+            job.news_num = args.per_source
+    if args.sources is not None:
+        jobs = {job.source: job for job in spec.jobs}
+        sources = [source.strip() for source in args.sources.split(',') if source.strip()]
+        spec.jobs = [jobs.get(source, SourceJob(source=source, news_num=spec.per_source)) for source in sources]
+    if args.out is not None:
+        spec.output = args.out
+    if args.format is not None:
+        spec.format = args.format
+    # Fetch arguments given on the command line override the options of the spec and of its sources
+    for name, value in vars(args).items():
+        if name in JOB_ARGUMENTS:
+            continue
+        spec.options[name] = value
+        for job in spec.jobs:
+            job.options.pop(name, None)
+    return spec
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser(prog="python -m parsers",
+                                          description="Build the news dataset from several sources at once")
+    commands = args_parser.add_subparsers(dest="command", required=True)
+    add_crawl_arguments(commands.add_parser("crawl", help="Parse the sources in parallel processes"))
+    add_reextract_arguments(commands.add_parser("reextract",
+                                                help="Extract the news again from the page archive of the crawls"))
+    add_frontier_arguments(commands.add_parser("frontier",
+                                               help="Crawl on several hosts: seed the shared frontier of the news, "
+                                                    "load them by the workers and export the result"))
+    args = args_parser.parse_args()
+
+    if args.command == "crawl":
+        spec = create_job_spec(args)
+        start_time = time.monotonic()
+        news_nums = run_job(spec, args.processes)
+        print(f"[Jobs] {sum(news_nums.values())} news from {len(news_nums)} sources "
+              f"in {time.monotonic() - start_time:.0f} s")
+    elif args.command == "reextract":
+        start_time = time.monotonic()
+        news_nums = reextract(args.archive, get_sources(args.sources), args.out, args.format, args.processes)
+        print(f"[Reextract] {sum(news_nums.values())} news from {len(news_nums)} sources "
+              f"in {time.monotonic() - start_time:.0f} s")
+    elif args.command == "frontier":
+        run_frontier_command(args, args_parser)
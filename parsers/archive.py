@@ -0,0 +1,130 @@
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from parsers.journal import decode_value, encode_value
+from parsers.urls import normalize_url
+
+
+PAGE_RECORD = "resource"  # HTML of a news page as the parser saw it
+NEWS_RECORD = "metadata"  # row of the news from the listing or the feed, the page values are added to it
+
+
+@dataclass(frozen=True)
+class ArchiveRecord:
+    file: str
+    offset: int
+    length: int
+
+
+# Append-only archive of the downloaded news pages in the WARC format: every record is a separate gzip member,
+# so a .warc.gz file is readable by the WARC tools and a record is decompressed alone by its offset.
+# Every parser appends to its own file, the offsets of the records are indexed by the parser and the normalized
+# URL in SQLite. Besides the pages the archive keeps the news rows, so the news are extracted again without the
+# sites, e.g. after a fix of the selectors.
+class PageArchive:
+
+    COMPRESS_LEVEL = 6
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.__lock = threading.Lock()
+        self.__files = dict()
+        self.__connection = sqlite3.connect(os.path.join(path, "index.sqlite"), check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS records (id INTEGER PRIMARY KEY, parser TEXT, "
+                                  "type TEXT, url TEXT, file TEXT, offset INTEGER, length INTEGER, created_at REAL)")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS records_url ON records (url, type)")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS records_parser ON records (parser, type)")
+        self.__connection.commit()
+
+    def add_page(self, parser: str, url: str, html: str):
+        self.__add_record(parser, PAGE_RECORD, url, "text/html; charset=utf-8", html.encode("utf-8"))
+
+    def add_news_row(self, parser: str, url: str, row: List):
+        content = json.dumps(row, ensure_ascii=False, default=encode_value).encode("utf-8")
+        self.__add_record(parser, NEWS_RECORD, url, "application/json", content)
+
+    def get_parsers(self) -> List[str]:
+        with self.__lock:
+            rows = self.__connection.execute("SELECT DISTINCT parser FROM records ORDER BY parser").fetchall()
+        return [parser for parser, in rows]
+
+    def find_page(self, url: str) -> Optional[ArchiveRecord]:
+        # The last archived page of the URL, whichever parser loaded it
+        with self.__lock:
+            row = self.__connection.execute("SELECT file, offset, length FROM records WHERE url = ? AND type = ? "
+                                            "ORDER BY id DESC LIMIT 1", (normalize_url(url), PAGE_RECORD)).fetchone()
+        return ArchiveRecord(*row) if row is not None else None
+
+    def iter_news_data(self, parsers: List[str]) -> Iterator[List]:
+        # Rows of the archived news of the parsers which have a page, the last row of every URL in the order of
+        # the crawls. Several runs of the same news give one row.
+        placeholders = ', '.join('?' * len(parsers))
+        with self.__lock:
+            rows = self.__connection.execute(
+                f"SELECT file, offset, length, MAX(id) FROM records WHERE parser IN ({placeholders}) AND type = ? "
+                f"AND url IN (SELECT url FROM records WHERE type = ?) GROUP BY url ORDER BY MAX(id)",
+                (*parsers, NEWS_RECORD, PAGE_RECORD)).fetchall()
+        for file, offset, length, _ in rows:
+            _, content = self.read_record(ArchiveRecord(file, offset, length))
+            yield json.loads(content.decode("utf-8"), object_hook=decode_value)
+
+    def read_page(self, record: ArchiveRecord) -> str:
+        _, content = self.read_record(record)
+        return content.decode("utf-8")
+
+    def read_record(self, record: ArchiveRecord) -> Tuple[Dict[str, str], bytes]:
+        with open(os.path.join(self.path, record.file), "rb") as archive_file:
+            archive_file.seek(record.offset)
+            data = gzip.decompress(archive_file.read(record.length))
+        head, _, body = data.partition(b"\r\n\r\n")
+        headers = dict()
+        for line in head.decode("utf-8").split("\r\n")[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip()] = value.strip()
+        return headers, body[:int(headers["Content-Length"])]
+
+    def close(self):
+        with self.__lock:
+            for archive_file in self.__files.values():
+                archive_file.close()
+            self.__files = dict()
+            self.__connection.close()
+
+    def __add_record(self, parser: str, record_type: str, url: str, content_type: str, content: bytes):
+        now = time.time()
+        headers = [
+            "WARC/1.1",
+            f"WARC-Type: {record_type}",
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+            f"WARC-Date: {datetime.fromtimestamp(now, timezone.utc):%Y-%m-%dT%H:%M:%SZ}",
+            f"WARC-Target-URI: {url}",
+            f"Parser: {parser}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(content)}",
+        ]
+        data = gzip.compress('\r\n'.join(headers).encode("utf-8") + b"\r\n\r\n" + content + b"\r\n\r\n",
+                             self.COMPRESS_LEVEL)
+        file_name = parser.replace(':', '_') + ".warc.gz"
+        with self.__lock:
+            archive_file = self.__files.get(file_name)
+            if archive_file is None:
+                archive_file = open(os.path.join(self.path, file_name), "ab")
+                self.__files[file_name] = archive_file
+            offset = archive_file.tell()
+            archive_file.write(data)
+            # The record is in the file before it is indexed, a crash leaves at most an unindexed tail
+            archive_file.flush()
+            self.__connection.execute("INSERT INTO records (parser, type, url, file, offset, length, created_at) "
+                                      "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                      (parser, record_type, normalize_url(url), file_name, offset, len(data), now))
+            self.__connection.commit()
@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+from parsers.urls import normalize_url
+
+
+# On-disk cache of the downloaded news pages: raw HTML keyed by the normalized URL, entries older than
+# `ttl` are ignored and the least recently used ones are evicted when the cache grows over `max_bytes`
+class PageCache:
+
+    TTL = 30 * 24 * 60 * 60  # seconds
+    MAX_BYTES = 1024 ** 3
+
+    def __init__(self, path: str, ttl: float = TTL, max_bytes: int = MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, content BLOB, "
+                                  "size INTEGER, created_at REAL, accessed_at REAL)")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)")
+        self.__connection.commit()
+        self.__size = self.__connection.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def get(self, url: str) -> Optional[str]:
+        key = normalize_url(url)
+        now = time.time()
+        with self.__lock:
+            row = self.__connection.execute("SELECT content, size, created_at FROM pages WHERE url = ?",
+                                            (key, )).fetchone()
+            if row is None:
+                return None
+            content, size, created_at = row
+            if now - created_at > self.ttl:
+                self.__connection.execute("DELETE FROM pages WHERE url = ?", (key, ))
+                self.__connection.commit()
+                self.__size -= size
+                return None
+            self.__connection.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (now, key))
+            self.__connection.commit()
+        return zlib.decompress(content).decode("utf-8")
+
+    def put(self, url: str, html: str):
+        key = normalize_url(url)
+        content = zlib.compress(html.encode("utf-8"))
+        now = time.time()
+        with self.__lock:
+            row = self.__connection.execute("SELECT size FROM pages WHERE url = ?", (key, )).fetchone()
+            self.__size -= row[0] if row is not None else 0
+            self.__connection.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                                      (key, content, len(content), now, now))
+            self.__size += len(content)
+            self.__evict()
+            self.__connection.commit()
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+    def __evict(self):
+        while self.__size > self.max_bytes:
+            rows = self.__connection.execute("SELECT url, size FROM pages ORDER BY accessed_at LIMIT 64").fetchall()
+            if not rows:
+                break
+            evicted_urls = []
+            for url, size in rows:
+                if self.__size <= self.max_bytes:
+                    break
+                evicted_urls.append((url, ))
+                self.__size -= size
+            self.__connection.executemany("DELETE FROM pages WHERE url = ?", evicted_urls)
@@ -0,0 +1,178 @@
+import argparse
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from parsers.archive import PageArchive
+from parsers.cache import PageCache
+from parsers.dedup import DedupIndex
+from parsers.discovery import Discovery
+from parsers.journal import CrawlJournal
+from parsers.metrics import ParserMetrics, write_metrics
+from parsers.parser import FetchBackend, PageLoadStrategy, Parser, ParseResult
+from parsers.sinks import EntitySink, open_sink
+from parsers.state import CrawlState
+
+
+# Metrics of all parsers finished by this process, the metrics file is rewritten with all of them
+finished_parsers_metrics: List[Tuple[str, ParserMetrics]] = []
+finished_parsers_lock = threading.Lock()
+
+
+def add_fetch_arguments(args_parser: argparse.ArgumentParser):
+    args_parser.add_argument("-w", "--workers", type=int, default=Parser.WORKERS_NUM,
+                             help="How many browser sessions load the news pages in parallel")
+    args_parser.add_argument("-b", "--fetch-backend", type=FetchBackend, choices=list(FetchBackend),
+                             help="How to load the news pages: selenium or http (default depends on the site)")
+    args_parser.add_argument("-d", "--discovery", type=Discovery, choices=list(Discovery),
+                             help="How to find the fresh news: listing pages in a browser or RSS feeds and date "
+                                  "archives over HTTP (default: listing). The feeds hold only the latest few dozen "
+                                  "to few hundred news, deeper crawls fall back to the listing")
+    args_parser.add_argument("--page-load-strategy", type=PageLoadStrategy, choices=list(PageLoadStrategy),
+                             help="When the browser considers a news page loaded (default: eager), the parsers "
+                                  "wait for the news text anyway")
+    args_parser.add_argument("--page-deadline", type=float,
+                             help=f"Seconds to load a news page until its text appears (default: "
+                                  f"{Parser.PAGE_DEADLINE})")
+    args_parser.add_argument("--pipeline", action="store_true",
+                             help="Load the news pages while the fresh news are still being discovered")
+    args_parser.add_argument("--prune-listing", action="store_true",
+                             help="Remove the read news cards from the listing page to keep it small, for the "
+                                  "very long listings")
+    args_parser.add_argument("--show-browser", action="store_true",
+                             help="Run the browsers with a window and load images, fonts and ads")
+    args_parser.add_argument("--page-cache",
+                             help="Path to the on-disk cache of the news pages, reused by the next runs")
+    args_parser.add_argument("--page-archive",
+                             help="Directory of the compressed archive of all loaded news pages, the news are "
+                                  "extracted from it again by `python -m parsers reextract`")
+    args_parser.add_argument("--dedup-index",
+                             help="Path to the index of the collected news shared by all sources and runs, the "
+                                  "collected news aren't loaded again and the reprints are flagged")
+    args_parser.add_argument("-i", "--incremental", metavar="STATE_FILE",
+                             help="Parse only the news published after the previous run with the same state file")
+    args_parser.add_argument("--metrics",
+                             help="File for the phase timings and counters of the parsers written after every "
+                                  "parser: .prom for the Prometheus text format, JSON otherwise")
+    args_parser.add_argument("--checkpoint-dir", default="checkpoints",
+                             help="Directory of the checkpoints of the running parses (default: checkpoints)")
+    args_parser.add_argument("--resume", action="store_true",
+                             help="Continue the interrupted parse from its checkpoint")
+
+
+@lru_cache(maxsize=None)
+def open_page_cache(path: str) -> PageCache:
+    return PageCache(path)
+
+
+@lru_cache(maxsize=None)
+def open_page_archive(path: str) -> PageArchive:
+    return PageArchive(path)
+
+
+@lru_cache(maxsize=None)
+def open_dedup_index(path: str) -> DedupIndex:
+    return DedupIndex(path)
+
+
+@lru_cache(maxsize=None)
+def open_crawl_state(path: str) -> CrawlState:
+    return CrawlState(path)
+
+
+def configure_parser(parser: Parser, args: argparse.Namespace, journal: bool = True):
+    parser.workers_num = args.workers
+    if args.fetch_backend is not None:
+        parser.fetch_backend = args.fetch_backend
+    if args.discovery is not None:
+        parser.discovery = args.discovery
+    if args.page_load_strategy is not None:
+        parser.page_load_strategy = args.page_load_strategy
+    if args.page_deadline is not None:
+        parser.page_deadline = args.page_deadline
+    parser.pipelined = args.pipeline
+    if args.prune_listing:
+        parser.prune_listing = True
+    if args.show_browser:
+        parser.headless = False
+        parser.block_resources = False
+    if args.page_cache is not None:
+        parser.page_cache = open_page_cache(args.page_cache)
+    if args.page_archive is not None:
+        parser.page_archive = open_page_archive(args.page_archive)
+    if args.dedup_index is not None:
+        parser.dedup_index = open_dedup_index(args.dedup_index)
+    if args.incremental is not None:
+        open_crawl_state(args.incremental).restore(parser)
+    if journal:
+        journal_name = parser.state_key.replace(':', '_') + ".jsonl"
+        parser.journal = CrawlJournal(os.path.join(args.checkpoint_dir, journal_name), resume=args.resume)
+
+
+def finish_parser(parser: Parser, parse_data: ParseResult, args: argparse.Namespace):
+    if args.incremental is not None:
+        crawl_state = open_crawl_state(args.incremental)
+        crawl_state.update(parser, parse_data)
+        crawl_state.save()
+    if parser.journal is not None:
+        parser.journal.close(remove=True)
+        parser.journal = None
+    save_parser_metrics(parser, args)
+
+
+def get_source_metrics_path(metrics_path: str, source: str) -> str:
+    # Every source process writes its own metrics file
+    metrics_root, metrics_extension = os.path.splitext(metrics_path)
+    return f"{metrics_root}_{source}{metrics_extension}"
+
+
+def save_parser_metrics(parser: Parser, args: argparse.Namespace):
+    if args.metrics is not None:
+        with finished_parsers_lock:
+            finished_parsers_metrics.append((parser.state_key, parser.metrics))
+            write_metrics(args.metrics, finished_parsers_metrics)
+
+
+def run_parsers(parsers: List[Tuple[Parser, int]], args: argparse.Namespace, jobs: int) -> ParseResult:
+    # The parsers run at the same time into memory, and their results are merged in the order of `parsers`,
+    # whichever of them finishes first. The shared caches and states are opened before the threads start.
+    for parser, _ in parsers:
+        configure_parser(parser, args)
+
+    def run_parser(parser: Parser, news_num: int) -> ParseResult:
+        parse_data = parser.parse(news_num)
+        finish_parser(parser, parse_data, args)
+        return parse_data
+
+    with ThreadPoolExecutor(max(1, jobs)) as executor:
+        results = list(executor.map(run_parser, [parser for parser, _ in parsers],
+                                    [news_num for _, news_num in parsers]))
+    parse_data = ParseResult()
+    for result in results:
+        parse_data += result
+    return parse_data
+
+
+def parse_date_argument(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}, use YYYY-MM-DD")
+
+
+def open_result_sink(output: str, name: Optional[str] = None) -> Optional[EntitySink]:
+    # Excel files are written at once after the parse, the other formats are streamed while parsing.
+    # `name` of the writer keeps the staging directory of the dataset apart from the other writers.
+    if os.path.splitext(output)[1] == '.xlsx':
+        return None
+    return open_sink(output, name)
+
+
+def save_parse_result(parse_data: ParseResult, output: str, result_sink: Optional[EntitySink]):
+    if result_sink is not None:
+        result_sink.close()
+    else:
+        parse_data.to_excel(output)
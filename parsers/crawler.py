@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import os
+from typing import List, Tuple
+
+from parsers.cli import configure_parser, finish_parser, open_result_sink, save_parse_result
+from parsers.parser import Parser, ParseResult
+from parsers.parser_iz import IZParser
+from parsers.parser_kp import KPParser
+from parsers.parser_meduza import MeduzaParser
+from parsers.parser_panorama import PanoramaCategories, PanoramaParser
+from parsers.parser_rt import RTParser
+from parsers.parser_tvrain import TVRainParser
+
+
+SOURCES = ["meduza", "tvrain", "panorama", "rt", "iz", "kp", ]
+FORMATS = ["csv", "jsonl", "parquet", "arrow", "xlsx", "dataset", ]
+
+
+def create_parsers(source: str, news_num: int) -> List[Tuple[Parser, int]]:
+    if source == "meduza":
+        return [(MeduzaParser(), news_num), ]
+    if source == "tvrain":
+        return [(TVRainParser(), news_num), ]
+    if source == "rt":
+        return [(RTParser(), news_num), ]
+    if source == "iz":
+        return [(IZParser(), news_num), ]
+    if source == "kp":
+        return [(KPParser(), news_num), ]
+    if source == "panorama":
+        categories = [PanoramaCategories.POLITICS, PanoramaCategories.SOCIETY, ]
+        news_step = news_num // len(categories)
+        parsers = []
+        for i, category in enumerate(categories):
+            category_news_num = news_step if i < len(categories) - 1 else news_num - news_step * i
+            parsers.append((PanoramaParser(category=category), category_news_num))
+        return parsers
+    raise ValueError(f"Unknown source {source}! Please use one of: {', '.join(SOURCES)}")
+
+
+async def crawl_source(source: str, news_num: int, args: argparse.Namespace) -> ParseResult:
+    # Selenium is blocking, so every source runs in its own thread. The sources share the host rate
+    # limiter and the connections limit of the fetch layer.
+    # All sources of the partitioned dataset are written to the same directory
+    output = args.output if args.format == "dataset" else os.path.join(args.output, f"{source}.{args.format}")
+    result_sink = open_result_sink(output, source)
+    parse_data = ParseResult()
+    for parser, parser_news_num in create_parsers(source, news_num):
+        configure_parser(parser, args)
+        parser.result_sink = result_sink
+        parser_data = await asyncio.to_thread(parser.parse, parser_news_num)
+        finish_parser(parser, parser_data, args)
+        parse_data += parser_data
+    save_parse_result(parse_data, output, result_sink)
+    return parse_data
+
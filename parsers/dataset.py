@@ -0,0 +1,86 @@
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+
+# Typed columns of the exported news, `source` and `day` are also the partitions of the Parquet dataset
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("date", pa.timestamp("us")),
+    ("link", pa.string()),
+    ("title", pa.string()),
+    ("text", pa.string()),
+    ("tags", pa.list_(pa.string())),
+    ("metadata", pa.list_(pa.string())),
+    ("source", pa.string()),
+    ("day", pa.date32()),
+])
+PARTITIONING = ds.partitioning(pa.schema([("source", pa.string()), ("day", pa.date32())]), flavor="hive")
+
+
+def get_source(link: str) -> str:
+    host = (urlsplit(link).hostname or "").lower()
+    return host[len("www."):] if host.startswith("www.") else host
+
+
+def to_naive_date(date: Optional[datetime]) -> Optional[datetime]:
+    # Dates are stored as the site's wall-clock time, the same as in the CSV files
+    return date.replace(tzinfo=None) if date is not None and date.tzinfo is not None else date
+
+
+def entities_to_table(entities: Iterable) -> pa.Table:
+    columns = {name: [] for name in SCHEMA.names}
+    for entity in entities:
+        date = to_naive_date(entity.date)
+        columns["id"].append(entity.id)
+        columns["date"].append(date)
+        columns["link"].append(entity.link)
+        columns["title"].append(entity.title)
+        columns["text"].append(entity.text)
+        columns["tags"].append(list(entity.tags))
+        columns["metadata"].append(list(entity.metadata))
+        columns["source"].append(get_source(entity.link))
+        columns["day"].append(date.date() if date is not None else None)
+    return pa.Table.from_pydict(columns, schema=SCHEMA)
+
+
+def write_dataset(table: pa.Table, path: str, compression: str = "zstd"):
+    # Every call adds new files, so several writers and runs can share one dataset directory
+    ds.write_dataset(table, path, format="parquet", partitioning=PARTITIONING,
+                     basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                     existing_data_behavior="overwrite_or_ignore",
+                     file_options=ds.ParquetFileFormat().make_write_options(compression=compression))
+
+
+def publish_dataset(staging_path: str, path: str):
+    # Moves the files of a finished run from its staging directory into the dataset
+    for directory, _, file_names in os.walk(staging_path):
+        target_directory = os.path.join(path, os.path.relpath(directory, staging_path))
+        os.makedirs(target_directory, exist_ok=True)
+        for file_name in file_names:
+            os.replace(os.path.join(directory, file_name), os.path.join(target_directory, file_name))
+    shutil.rmtree(staging_path)
+
+
+def load_dataset(path: str, columns: List[str] = None, sources: List[str] = None,
+                 from_day: datetime = None, to_day: datetime = None) -> pa.Table:
+    # Only the requested columns and partitions are read, e.g.
+    # load_dataset("data/", columns=["title", "text"], sources=["meduza.io"]).to_pandas()
+    dataset = ds.dataset(path, format="parquet", partitioning=PARTITIONING)
+    conditions = []
+    if sources is not None:
+        conditions.append(ds.field("source").isin(sources))
+    if from_day is not None:
+        conditions.append(ds.field("day") >= from_day.date())
+    if to_day is not None:
+        conditions.append(ds.field("day") <= to_day.date())
+    condition = None
+    for part in conditions:
+        condition = part if condition is None else condition & part
+    return dataset.to_table(columns=columns, filter=condition)
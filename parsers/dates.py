@@ -0,0 +1,89 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import dateparser
+
+
+MONTHS = {
+    "января": 1, "январь": 1, "янв": 1,
+    "февраля": 2, "февраль": 2, "фев": 2,
+    "марта": 3, "март": 3, "мар": 3,
+    "апреля": 4, "апрель": 4, "апр": 4,
+    "мая": 5, "май": 5,
+    "июня": 6, "июнь": 6, "июн": 6,
+    "июля": 7, "июль": 7, "июл": 7,
+    "августа": 8, "август": 8, "авг": 8,
+    "сентября": 9, "сентябрь": 9, "сен": 9, "сент": 9,
+    "октября": 10, "октябрь": 10, "окт": 10,
+    "ноября": 11, "ноябрь": 11, "ноя": 11,
+    "декабря": 12, "декабрь": 12, "дек": 12,
+}
+
+_MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+_DAY_MONTH_YEAR = rf"(?P<day>\d{{1,2}})\s+(?P<month>{_MONTH})\.?(?:\s+(?P<year>\d{{4}})(?:\s*(?:г\.|года))?)?"
+_NUMERIC_DATE = r"(?P<day>\d{1,2})\.(?P<month_num>\d{1,2})\.(?P<year>\d{4})"
+_TIME = r"(?P<hour>\d{1,2}):(?P<minute>\d{2})"
+_TIME_SEP = r"(?:\s*[,|•]\s*|\s+)(?:в\s+)?"
+
+# "12 апреля 2024, 18:31", "12 апреля 2024 в 18:31", "12 апреля, 18:31", "12 апреля 2024"
+DAY_MONTH_YEAR_TIME = re.compile(rf"{_DAY_MONTH_YEAR}(?:{_TIME_SEP}{_TIME})?", re.IGNORECASE)
+# "18:31, 12 апреля 2024"
+TIME_DAY_MONTH_YEAR = re.compile(rf"{_TIME}{_TIME_SEP}{_DAY_MONTH_YEAR}", re.IGNORECASE)
+# "12.04.2024 18:31", "12.04.2024"
+NUMERIC_DATE_TIME = re.compile(rf"{_NUMERIC_DATE}(?:{_TIME_SEP}{_TIME})?", re.IGNORECASE)
+
+# Date layouts of the article pages of every source, the first matching pattern wins
+SOURCE_DATE_PATTERNS: Dict[str, List[re.Pattern]] = {
+    "meduza": [TIME_DAY_MONTH_YEAR, DAY_MONTH_YEAR_TIME, ],
+    "tvrain": [DAY_MONTH_YEAR_TIME, TIME_DAY_MONTH_YEAR, ],
+    "rt": [DAY_MONTH_YEAR_TIME, NUMERIC_DATE_TIME, ],
+    "iz": [DAY_MONTH_YEAR_TIME, NUMERIC_DATE_TIME, ],
+    "kp": [DAY_MONTH_YEAR_TIME, NUMERIC_DATE_TIME, ],
+}
+ALL_DATE_PATTERNS = [DAY_MONTH_YEAR_TIME, TIME_DAY_MONTH_YEAR, NUMERIC_DATE_TIME, ]
+
+
+def parse_news_date(text: str, source: str = None) -> Optional[datetime]:
+    # Known layouts are parsed with the precompiled patterns, anything else ("вчера, 18:31", "5 минут назад")
+    # goes to dateparser
+    text = ' '.join(text.split())
+    if not text:
+        return None
+    for pattern in SOURCE_DATE_PATTERNS.get(source, ALL_DATE_PATTERNS):
+        match = pattern.fullmatch(text)
+        if match is not None:
+            news_date = _match_to_date(match)
+            if news_date is not None:
+                return news_date
+    return parse_date_with_dateparser(text)
+
+
+def parse_date_with_dateparser(text: str) -> Optional[datetime]:
+    # Relative dates depend on the current time, so it is a part of the cache key, rounded to the minute
+    return _parse_date_with_dateparser(text, datetime.now().replace(second=0, microsecond=0))
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_with_dateparser(text: str, relative_base: datetime) -> Optional[datetime]:
+    return dateparser.parse(text, languages=["ru"], settings={"RELATIVE_BASE": relative_base})
+
+
+# The memoized fallback is cleared by its public name, e.g. by the benchmark before measuring it
+parse_date_with_dateparser.cache_clear = _parse_date_with_dateparser.cache_clear
+
+
+def _match_to_date(match: re.Match) -> Optional[datetime]:
+    fields = match.groupdict()
+    month = MONTHS[fields["month"].lower()] if fields.get("month") else int(fields["month_num"])
+    hour, minute = (int(fields["hour"]), int(fields["minute"])) if fields["hour"] else (0, 0)
+    now = datetime.now()
+    try:
+        news_date = datetime(int(fields["year"] or now.year), month, int(fields["day"]), hour, minute)
+    except ValueError:
+        return None
+    # Without a year the date is in the current year, unless it would be in the future
+    if not fields["year"] and news_date > now:
+        news_date = news_date.replace(year=now.year - 1)
+    return news_date
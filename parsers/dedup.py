@@ -0,0 +1,109 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from hashlib import blake2b
+from typing import Optional, Set
+
+import numpy as np
+
+from parsers.urls import normalize_url
+
+
+WORD_PATTERN = re.compile(r"\w+")
+SHINGLE_SIZE = 3  # words
+SIMHASH_BITS = 64
+BANDS_NUM = 4  # parts of the fingerprint indexed separately to find the near-duplicates
+MAX_DISTANCE = 3  # bits
+
+
+def simhash(text: str) -> Optional[int]:
+    # 64-bit SimHash over the word shingles: every bit is the majority vote of the shingle hashes
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return None
+    shingles = {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    hashes = b''.join(blake2b(shingle.encode("utf-8"), digest_size=SIMHASH_BITS // 8).digest()
+                      for shingle in shingles)
+    bits = np.unpackbits(np.frombuffer(hashes, dtype=np.uint8), bitorder="little")
+    votes = bits.reshape(-1, SIMHASH_BITS).sum(axis=0, dtype=np.int64) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(votes, bitorder="little").tobytes(), "little")
+
+
+def hamming_distance(first: int, second: int) -> int:
+    return (first ^ second).bit_count()
+
+
+# Persistent index of the collected news over all sources and runs: normalized links and SimHash fingerprints
+# of the texts. Links are claimed before their pages are loaded, so a news collected once is never loaded again.
+# Texts within MAX_DISTANCE bits of a text of another link are reported as near-duplicates (reprints).
+class DedupIndex:
+
+    BAND_BITS = SIMHASH_BITS // BANDS_NUM
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.__lock = threading.Lock()
+        self.__claimed_links: Set[str] = set()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        bands = ', '.join(f"band{i} INTEGER" for i in range(BANDS_NUM))
+        self.__connection.execute(f"CREATE TABLE IF NOT EXISTS news (url TEXT PRIMARY KEY, simhash INTEGER, {bands}, "
+                                  f"created_at REAL)")
+        for i in range(BANDS_NUM):
+            self.__connection.execute(f"CREATE INDEX IF NOT EXISTS news_band{i} ON news (band{i})")
+        self.__connection.commit()
+
+    def claim(self, link: str) -> bool:
+        # False if the news is already in the index or claimed by another parser of this run
+        url = normalize_url(link)
+        with self.__lock:
+            if url in self.__claimed_links:
+                return False
+            if self.__connection.execute("SELECT 1 FROM news WHERE url = ?", (url, )).fetchone() is not None:
+                return False
+            self.__claimed_links.add(url)
+            return True
+
+    def add(self, link: str, text: str) -> Optional[str]:
+        # Stores the news and returns the link of its near-duplicate from the index, if there is one
+        url = normalize_url(link)
+        fingerprint = simhash(text)
+        with self.__lock:
+            duplicate_url = None if fingerprint is None else self.__find_near_duplicate(url, fingerprint)
+            bands = self.__get_bands(fingerprint) if fingerprint is not None else [None] * BANDS_NUM
+            self.__connection.execute(f"INSERT OR REPLACE INTO news VALUES (?, ?, {', '.join('?' * BANDS_NUM)}, ?)",
+                                      (url, self.__to_signed(fingerprint), *bands, time.time()))
+            self.__connection.commit()
+            self.__claimed_links.add(url)
+        return duplicate_url
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+    def __find_near_duplicate(self, url: str, fingerprint: int) -> Optional[str]:
+        # Pigeonhole principle: fingerprints within MAX_DISTANCE < BANDS_NUM bits share at least one band
+        bands = self.__get_bands(fingerprint)
+        condition = ' OR '.join(f"band{i} = ?" for i in range(BANDS_NUM))
+        rows = self.__connection.execute(f"SELECT url, simhash FROM news WHERE url != ? AND ({condition})",
+                                         (url, *bands))
+        for candidate_url, candidate in rows:
+            if hamming_distance(fingerprint, candidate & (2 ** SIMHASH_BITS - 1)) <= MAX_DISTANCE:
+                return candidate_url
+        return None
+
+    @classmethod
+    def __get_bands(cls, fingerprint: int):
+        mask = 2 ** cls.BAND_BITS - 1
+        return [(fingerprint >> (i * cls.BAND_BITS)) & mask for i in range(BANDS_NUM)]
+
+    @staticmethod
+    def __to_signed(fingerprint: Optional[int]) -> Optional[int]:
+        # SQLite integers are signed 64-bit
+        if fingerprint is None or fingerprint < 2 ** (SIMHASH_BITS - 1):
+            return fingerprint
+        return fingerprint - 2 ** SIMHASH_BITS
@@ -0,0 +1,110 @@
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from enum import Enum
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+from requests import RequestException
+from selenium.common.exceptions import TimeoutException
+
+from parsers.urls import normalize_url
+
+
+MOSCOW_TIMEZONE = timezone(timedelta(hours=3))
+
+
+class Discovery(str, Enum):
+    LISTING = "listing"  # click "More" or scroll the listing page in a browser
+    FEED = "feed"  # read the RSS feeds or the date archives of the site over plain HTTP
+
+    def __str__(self):
+        return self.value
+
+
+@dataclass(slots=True)
+class DiscoveredNews:
+    link: str
+    title: str = ""
+    subtitle: str = ""
+    tag: str = ""
+    date: Optional[datetime] = None
+
+
+def parse_feed(xml: str) -> List[DiscoveredNews]:
+    news = []
+    for item in ElementTree.fromstring(xml.strip()).iter("item"):
+        link = (item.findtext("link") or "").strip()
+        if not link:
+            continue
+        news.append(DiscoveredNews(link=link, title=_clean_text(item.findtext("title")),
+                                   subtitle=_clean_text(item.findtext("description")),
+                                   tag=_clean_text(item.findtext("category")),
+                                   date=_parse_feed_date(item.findtext("pubDate"))))
+    return news
+
+
+def discover_feed_news(fetcher, feeds: List[str]) -> List[DiscoveredNews]:
+    # The feeds are loaded in parallel, their news are merged newest first without duplicates
+    if not feeds:
+        return []
+    with ThreadPoolExecutor(len(feeds)) as executor:
+        feeds_news = list(executor.map(lambda feed: _load_feed(fetcher, feed), feeds))
+    news, links = [], set()
+    for feed_news in feeds_news:
+        for item in feed_news:
+            link = normalize_url(item.link)
+            if link not in links:
+                links.add(link)
+                news.append(item)
+    news.sort(key=lambda item: item.date or datetime.min, reverse=True)
+    return news
+
+
+def discover_archive_news(fetcher, archive_url: Callable, parse_archive: Callable, days: List[datetime],
+                          workers_num: int) -> Iterator[Tuple[datetime, List[DiscoveredNews]]]:
+    # Every day of the archive is a separate page, so the days are loaded in parallel and yielded in the given order
+    def load_day(day):
+        url = archive_url(day)
+        try:
+            with fetcher.page(url) as page:
+                return parse_archive(page)
+        except (TimeoutException, RequestException) as e:
+            print(f"[Discovery][Warning] Skip archive {url}: {e!r}")
+            return []
+
+    with ThreadPoolExecutor(max(1, workers_num)) as executor:
+        yield from zip(days, executor.map(load_day, days))
+
+
+def _load_feed(fetcher, feed: str) -> List[DiscoveredNews]:
+    try:
+        with fetcher.page(feed) as page:
+            return parse_feed(page.page_source)
+    except (TimeoutException, RequestException, ElementTree.ParseError) as e:
+        print(f"[Discovery][Warning] Skip feed {feed}: {e!r}")
+        return []
+
+
+def _clean_text(text: Optional[str]) -> str:
+    # Descriptions of the feeds can hold HTML markup
+    if not text:
+        return ""
+    if '<' in text:
+        text = BeautifulSoup(text, "html.parser").get_text(' ')
+    return ' '.join(text.split())
+
+
+def _parse_feed_date(text: Optional[str]) -> Optional[datetime]:
+    # Dates of the parsed pages are naive Moscow time, the feed dates are converted to the same form
+    if not text:
+        return None
+    try:
+        date = parsedate_to_datetime(text.strip())
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is not None:
+        date = date.astimezone(MOSCOW_TIMEZONE).replace(tzinfo=None)
+    return date
@@ -0,0 +1,288 @@
+import hmac
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from parsers.journal import decode_value, encode_value
+from parsers.parser import ParseEntity
+from parsers.urls import normalize_url
+
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+TOKEN_HEADER = "X-Frontier-Token"
+
+
+def entity_to_dict(entity: ParseEntity) -> Dict:
+    return {name: getattr(entity, name) for name in entity.__slots__}
+
+
+def entity_from_dict(values: Dict) -> ParseEntity:
+    return ParseEntity(**values)
+
+
+def to_json(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=encode_value)
+
+
+def from_json(value: str):
+    return json.loads(value, object_hook=decode_value)
+
+
+# News rows of one parser leased to a worker until `expires_at`
+@dataclass
+class Lease:
+    id: str
+    parser: str
+    expires_at: float
+    items: List[Tuple[int, List]]  # (item id, news row)
+
+
+# Shared queue of the news of the crawl. The titles phase adds the news rows, the workers claim batches of them
+# under a lease, load their pages and commit the entities. A commit is accepted only for the items still held by
+# its lease, so every news gets exactly one entity, even if its lease expired and it was loaded again by another
+# worker. The items of a crashed worker are claimed again after the lease expires.
+class Frontier:
+
+    PAGE_SIZE = 500  # entities read at once
+
+    def add_news(self, parser: str, news_data: List[List], link_index: int) -> int:
+        # Adds the rows of the news which aren't in the frontier yet, returns their number
+        raise NotImplementedError
+
+    def claim(self, parser: str, worker: str, batch_size: int) -> Optional[Lease]:
+        # None if no news of the parser can be claimed now
+        raise NotImplementedError
+
+    def commit(self, lease_id: str, entities: Dict[int, Optional[ParseEntity]]) -> int:
+        # Entities of the leased items, None for the failed ones. Returns the number of committed items.
+        raise NotImplementedError
+
+    def get_progress(self, parser: str) -> Dict[str, int]:
+        # Number of the items of the parser in every state
+        raise NotImplementedError
+
+    def read_entities(self, parser: str, after_id: int, limit: int) -> List[Tuple[int, ParseEntity]]:
+        # Committed entities of the parser with the item ids after `after_id`, in the order of the news
+        raise NotImplementedError
+
+    def iter_entities(self, parser: str) -> Iterator[ParseEntity]:
+        after_id = 0
+        while entities := self.read_entities(parser, after_id, self.PAGE_SIZE):
+            for after_id, entity in entities:
+                yield entity
+
+    def close(self):
+        pass
+
+
+# Frontier of one host in SQLite: the worker processes of the host share the database file, the claims and
+# commits are serialized by its write lock
+class SqliteFrontier(Frontier):
+
+    LEASE_TIMEOUT = 600  # seconds to load a batch before it is claimed by another worker
+    ATTEMPTS_NUM = 3  # leases of one item, the item fails after that many expired ones
+    BUSY_TIMEOUT = 30  # seconds to wait for the write lock of the other processes
+
+    def __init__(self, path: str, lease_timeout: float = LEASE_TIMEOUT):
+        self.path = path
+        self.lease_timeout = lease_timeout
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, timeout=self.BUSY_TIMEOUT, isolation_level=None,
+                                            check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, parser TEXT, url TEXT, "
+                                  "row TEXT, state TEXT, lease_id TEXT, lease_expires_at REAL, attempts INTEGER, "
+                                  "UNIQUE (parser, url))")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS items_state ON items (parser, state)")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS items_lease ON items (lease_id)")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS entities (item_id INTEGER PRIMARY KEY, entity TEXT, "
+                                  "committed_at REAL)")
+
+    def add_news(self, parser: str, news_data: List[List], link_index: int) -> int:
+        rows = [(parser, normalize_url(row[link_index]), to_json(row), PENDING) for row in news_data]
+        with self.__transaction() as connection:
+            changes = connection.total_changes
+            connection.executemany("INSERT OR IGNORE INTO items (parser, url, row, state, attempts) "
+                                   "VALUES (?, ?, ?, ?, 0)", rows)
+            return connection.total_changes - changes
+
+    def claim(self, parser: str, worker: str, batch_size: int) -> Optional[Lease]:
+        now = time.time()
+        lease = Lease(id=f"{worker}:{uuid.uuid4().hex}", parser=parser, expires_at=now + self.lease_timeout,
+                      items=[])
+        with self.__transaction() as connection:
+            # Items of the expired leases are claimed again until they run out of attempts
+            connection.execute("UPDATE items SET state = ?, lease_id = NULL WHERE parser = ? AND state = ? "
+                               "AND lease_expires_at < ? AND attempts >= ?",
+                               (FAILED, parser, LEASED, now, self.ATTEMPTS_NUM))
+            rows = connection.execute("SELECT id, row FROM items WHERE parser = ? AND (state = ? OR state = ? "
+                                      "AND lease_expires_at < ?) ORDER BY id LIMIT ?",
+                                      (parser, PENDING, LEASED, now, batch_size)).fetchall()
+            connection.executemany("UPDATE items SET state = ?, lease_id = ?, lease_expires_at = ?, "
+                                   "attempts = attempts + 1 WHERE id = ?",
+                                   [(LEASED, lease.id, lease.expires_at, item_id) for item_id, _ in rows])
+        if not rows:
+            return None
+        lease.items = [(item_id, from_json(row)) for item_id, row in rows]
+        return lease
+
+    def commit(self, lease_id: str, entities: Dict[int, Optional[ParseEntity]]) -> int:
+        now = time.time()
+        with self.__transaction() as connection:
+            item_ids = [item_id for item_id, in connection.execute(
+                "SELECT id FROM items WHERE lease_id = ? AND state = ?", (lease_id, LEASED))]
+            connection.executemany("INSERT INTO entities VALUES (?, ?, ?)",
+                                   [(item_id, to_json(entity_to_dict(entities[item_id])), now)
+                                    for item_id in item_ids if entities.get(item_id) is not None])
+            connection.executemany("UPDATE items SET state = ?, lease_id = NULL WHERE id = ?",
+                                   [(DONE if entities.get(item_id) is not None else FAILED, item_id)
+                                    for item_id in item_ids])
+        return len(item_ids)
+
+    def get_progress(self, parser: str) -> Dict[str, int]:
+        with self.__lock:
+            rows = self.__connection.execute("SELECT state, COUNT(*) FROM items WHERE parser = ? GROUP BY state",
+                                             (parser, )).fetchall()
+        return dict(rows)
+
+    def read_entities(self, parser: str, after_id: int, limit: int) -> List[Tuple[int, ParseEntity]]:
+        with self.__lock:
+            rows = self.__connection.execute("SELECT item_id, entity FROM entities JOIN items ON item_id = id "
+                                             "WHERE parser = ? AND item_id > ? ORDER BY item_id LIMIT ?",
+                                             (parser, after_id, limit)).fetchall()
+        return [(item_id, entity_from_dict(from_json(entity))) for item_id, entity in rows]
+
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+    @contextmanager
+    def __transaction(self):
+        # The write lock is taken at the start, so the items read by a claim can't be claimed by another process
+        with self.__lock:
+            self.__connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.__connection
+            except BaseException:
+                self.__connection.execute("ROLLBACK")
+                raise
+            self.__connection.execute("COMMIT")
+
+
+# HTTP API of a frontier for the workers of several hosts, every method of the frontier is a POST of its
+# arguments as a JSON object to /<method>. With a token the requests without it in TOKEN_HEADER are refused.
+class FrontierHandler(BaseHTTPRequestHandler):
+    frontier: Optional[Frontier] = None
+    token: Optional[str] = None
+    METHODS = {"add_news", "claim", "commit", "get_progress", "read_entities", }
+
+    def do_POST(self):
+        if self.token is not None and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ""), self.token):
+            self.send_error(403)
+            return
+        method = self.path.strip('/')
+        if method not in self.METHODS:
+            self.send_error(404)
+            return
+        arguments = from_json(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8"))
+        if method == "commit":
+            arguments["entities"] = {int(item_id): entity_from_dict(entity) if entity is not None else None
+                                     for item_id, entity in arguments["entities"].items()}
+        try:
+            result = getattr(self.frontier, method)(**arguments)
+        except Exception as e:
+            print(f"[FrontierServer][Warning] {method} failed: {e!r}")
+            self.send_error(500, repr(e))
+            return
+        if isinstance(result, Lease):
+            result = vars(result)
+        elif method == "read_entities":
+            result = [(item_id, entity_to_dict(entity)) for item_id, entity in result]
+        body = to_json({"result": result}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FrontierServer(ThreadingHTTPServer):
+    def __init__(self, frontier: Frontier, host: str = "127.0.0.1", port: int = 0, token: Optional[str] = None):
+        handler = type("BoundFrontierHandler", (FrontierHandler, ), {"frontier": frontier, "token": token})
+        super().__init__((host, port), handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+# Client of the frontier server, the same interface as the local frontier
+class HttpFrontier(Frontier):
+
+    TIMEOUT = 60  # seconds
+
+    def __init__(self, url: str, token: Optional[str] = None):
+        self.url = url.rstrip('/')
+        self.__session = requests.Session()
+        if token is not None:
+            self.__session.headers[TOKEN_HEADER] = token
+        self.__lock = threading.Lock()
+
+    def add_news(self, parser: str, news_data: List[List], link_index: int) -> int:
+        return self.__call("add_news", parser=parser, news_data=news_data, link_index=link_index)
+
+    def claim(self, parser: str, worker: str, batch_size: int) -> Optional[Lease]:
+        lease = self.__call("claim", parser=parser, worker=worker, batch_size=batch_size)
+        if lease is None:
+            return None
+        lease["items"] = [(item_id, row) for item_id, row in lease["items"]]
+        return Lease(**lease)
+
+    def commit(self, lease_id: str, entities: Dict[int, Optional[ParseEntity]]) -> int:
+        entities = {item_id: entity_to_dict(entity) if entity is not None else None
+                    for item_id, entity in entities.items()}
+        return self.__call("commit", lease_id=lease_id, entities=entities)
+
+    def get_progress(self, parser: str) -> Dict[str, int]:
+        return self.__call("get_progress", parser=parser)
+
+    def read_entities(self, parser: str, after_id: int, limit: int) -> List[Tuple[int, ParseEntity]]:
+        entities = self.__call("read_entities", parser=parser, after_id=after_id, limit=limit)
+        return [(item_id, entity_from_dict(entity)) for item_id, entity in entities]
+
+    def close(self):
+        self.__session.close()
+
+    def __call(self, method: str, **arguments):
+        with self.__lock:
+            response = self.__session.post(f"{self.url}/{method}", data=to_json(arguments).encode("utf-8"),
+                                           headers={"Content-Type": "application/json; charset=utf-8"},
+                                           timeout=self.TIMEOUT)
+        response.raise_for_status()
+        return from_json(response.content.decode("utf-8"))["result"]
+
+
+def open_frontier(location: str, token: Optional[str] = None) -> Frontier:
+    # URL of a frontier server or path to the SQLite frontier of this host
+    if location.startswith(("http://", "https://")):
+        return HttpFrontier(location, token)
+    return SqliteFrontier(location)
@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from parsers.cli import add_fetch_arguments, get_source_metrics_path
+from parsers.crawler import crawl_source, FORMATS, SOURCES
+from parsers.parser import host_rate_limiter, HostRateLimiter
+
+
+# One source of the crawl. `options` are the fetch arguments of the CLI without the dashes,
+# e.g. {"workers": 8, "fetch_backend": "http"}, they override the options of the whole job.
+@dataclass
+class SourceJob:
+    source: str
+    news_num: int
+    options: Dict[str, Any] = field(default_factory=dict)
+
+
+# Job spec file:
+# {
+#     "out": "data/",
+#     "format": "dataset",
+#     "per_source": 5000,
+#     "options": {"workers": 4, "dedup_index": "data/dedup.sqlite"},
+#     "sources": ["meduza", "rt", {"source": "iz", "news_num": 1000, "options": {"discovery": "feed"}}]
+# }
+@dataclass
+class JobSpec:
+    output: str
+    jobs: List[SourceJob]
+    format: str = "dataset"
+    per_source: Optional[int] = None  # news number of the sources without their own
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str) -> "JobSpec":
+        with open(path, encoding="utf-8") as spec_file:
+            return cls.from_dict(json.load(spec_file))
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> "JobSpec":
+        jobs = []
+        for source in spec.get("sources", SOURCES):
+            if isinstance(source, str):
+                source = {"source": source}
+            jobs.append(SourceJob(source=source["source"], news_num=source.get("news_num", spec.get("per_source")),
+                                  options=source.get("options", dict())))
+        return cls(output=spec.get("out"), jobs=jobs, format=spec.get("format", "dataset"),
+                   per_source=spec.get("per_source"), options=spec.get("options", dict()))
+
+    def validate(self):
+        if not self.output:
+            raise ValueError("Output directory of the job isn't set!")
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown format {self.format}! Please use one of: {', '.join(FORMATS)}")
+        for job in self.jobs:
+            if job.source not in SOURCES:
+                raise ValueError(f"Unknown source {job.source}! Please use one of: {', '.join(SOURCES)}")
+            if job.news_num is None:
+                raise ValueError(f"News number of {job.source} isn't set!")
+
+
+def create_job_args_parser() -> argparse.ArgumentParser:
+    args_parser = argparse.ArgumentParser(add_help=False)
+    add_fetch_arguments(args_parser)
+    args_parser.add_argument("-c", "--max-connections", type=int, default=HostRateLimiter.CONNECTIONS_LIMIT)
+    return args_parser
+
+
+def options_to_argv(options: Dict[str, Any]) -> List[str]:
+    # The options are parsed by the same argparse parser as the CLI, so they are validated and typed the same way
+    argv = []
+    for name, value in options.items():
+        flag = "--" + name.replace('_', '-')
+        if value is True:
+            argv.append(flag)
+        elif value is not None and value is not False:
+            argv += [flag, str(value)]
+    return argv
+
+
+def create_job_args(spec: JobSpec, job: SourceJob) -> argparse.Namespace:
+    args = create_job_args_parser().parse_args(options_to_argv({**spec.options, **job.options}))
+    args.output = spec.output
+    args.format = spec.format
+    if args.metrics is not None:
+        args.metrics = get_source_metrics_path(args.metrics, job.source)
+    return args
+
+
+def run_source_job(spec: JobSpec, job: SourceJob) -> Tuple[int, float]:
+    # Runs in a separate process: one source with its own browsers, rate limiter and sink.
+    # The partitioned dataset of all processes is written to the same directory with unique file names.
+    args = create_job_args(spec, job)
+    host_rate_limiter.set_connections_limit(args.max_connections)
+    start_time = time.monotonic()
+    parse_data = asyncio.run(crawl_source(job.source, job.news_num, args))
+    return len(parse_data), time.monotonic() - start_time
+
+
+def run_job(spec: JobSpec, processes: Optional[int] = None) -> Dict[str, int]:
+    spec.validate()
+    os.makedirs(spec.output, exist_ok=True)
+    news_nums = dict()
+    with ProcessPoolExecutor(max_workers=processes or len(spec.jobs)) as executor:
+        futures = [(job, executor.submit(run_source_job, spec, job)) for job in spec.jobs]
+        for job, future in futures:
+            try:
+                news_num, seconds = future.result()
+            except Exception as e:
+                print(f"[Jobs][Warning] {job.source} failed: {e!r}")
+                continue
+            print(f"[Jobs] {job.source}: {news_num} news in {seconds:.0f} s")
+            news_nums[job.source] = news_num
+    return news_nums
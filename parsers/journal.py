@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+def encode_value(value):
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def decode_value(value: Dict):
+    if "$datetime" in value:
+        return datetime.fromisoformat(value["$datetime"])
+    return value
+
+
+# Append-only checkpoint of a running parse: the news list of the titles phase and the result of every
+# loaded news page, one JSON record per line. A crashed run is resumed from the last flushed record.
+class CrawlJournal:
+
+    FLUSH_RECORDS_NUM = 20
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__records_num = 0
+        self.__news_data: Optional[List] = None
+        self.__news_pages: Dict[int, Optional[List]] = dict()
+        if resume and os.path.exists(path):
+            self.__load()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.__file = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def restore_news_data(self) -> Optional[List]:
+        return self.__news_data
+
+    def restore_news_pages(self) -> Dict[int, Optional[List]]:
+        # The pages loaded by the pipelined mode before the end of the titles phase belong to a news list which
+        # hasn't been checkpointed, so they are loaded again
+        return self.__news_pages if self.__news_data is not None else dict()
+
+    def add_news_data(self, news_data: List):
+        self.__write({"news_data": news_data})
+
+    def add_news_page(self, index: int, news_page: Optional[tuple]):
+        self.__write({"page": index, "result": news_page})
+
+    def flush(self):
+        with self.__lock:
+            self.__file.flush()
+
+    def close(self, remove: bool = False):
+        with self.__lock:
+            self.__file.close()
+            if remove:
+                os.remove(self.path)
+
+    def __write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, default=encode_value)
+        with self.__lock:
+            self.__file.write(line + "\n")
+            self.__records_num += 1
+            if "news_data" in record or self.__records_num % self.FLUSH_RECORDS_NUM == 0:
+                self.__file.flush()
+
+    def __load(self):
+        valid_size = 0
+        with open(self.path, "rb") as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line.decode("utf-8"), object_hook=decode_value)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                valid_size += len(line)
+                if "news_data" in record:
+                    self.__news_data = record["news_data"]
+                    self.__news_pages = dict()
+                else:
+                    self.__news_pages[record["page"]] = record["result"]
+        # Drop the tail written by the crashed run, the new records are appended after the last complete one
+        os.truncate(self.path, valid_size)
@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Tuple
+
+
+# Runtime metrics of one parser: total time and number of calls of every phase, counters of events
+# (pages, bytes, failures, blocks, ...) and peak values (driver memory). Phases can be nested, e.g. "extract"
+# includes "dates", and the phases of the worker threads are summed, so they can exceed the wall time.
+class ParserMetrics:
+    def __init__(self):
+        self.start_time = time.time()
+        self.__lock = threading.Lock()
+        self.__phases: Dict[str, list] = dict()
+        self.__counters: Dict[str, float] = dict()
+        self.__peaks: Dict[str, float] = dict()
+
+    @contextmanager
+    def timer(self, phase: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(phase, time.perf_counter() - start_time)
+
+    def add_time(self, phase: str, seconds: float):
+        with self.__lock:
+            phase_time = self.__phases.setdefault(phase, [0.0, 0])
+            phase_time[0] += seconds
+            phase_time[1] += 1
+
+    def increment(self, counter: str, value: float = 1):
+        with self.__lock:
+            self.__counters[counter] = self.__counters.get(counter, 0) + value
+
+    def update_peak(self, name: str, value: float):
+        with self.__lock:
+            self.__peaks[name] = max(self.__peaks.get(name, value), value)
+
+    def to_dict(self) -> Dict:
+        with self.__lock:
+            phases = {phase: {"seconds": round(seconds, 6), "calls": calls}
+                      for phase, (seconds, calls) in self.__phases.items()}
+            counters = dict(self.__counters)
+            peaks = dict(self.__peaks)
+        texts_seconds = phases.get("texts", {}).get("seconds", 0)
+        return {
+            "started_at": self.start_time,
+            "elapsed_seconds": round(time.time() - self.start_time, 6),
+            "pages_per_second": round(counters.get("pages", 0) / texts_seconds, 6) if texts_seconds else 0,
+            "phases": phases,
+            "counters": counters,
+            "peaks": peaks,
+        }
+
+
+def write_metrics(path: str, metrics: Iterable[Tuple[str, ParserMetrics]]):
+    # Prometheus text format for the .prom files (e.g. for the textfile collector of node_exporter), JSON otherwise
+    metrics = {name: parser_metrics.to_dict() for name, parser_metrics in metrics}
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as metrics_file:
+        if os.path.splitext(path)[1] == ".prom":
+            metrics_file.write(to_prometheus_text(metrics))
+        else:
+            json.dump(metrics, metrics_file, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def to_prometheus_text(metrics: Dict[str, Dict]) -> str:
+    samples = {
+        "news_parser_phase_seconds_total": ("counter", []),
+        "news_parser_phase_calls_total": ("counter", []),
+        "news_parser_events_total": ("counter", []),
+        "news_parser_peak": ("gauge", []),
+        "news_parser_pages_per_second": ("gauge", []),
+        "news_parser_elapsed_seconds": ("gauge", []),
+    }
+    for name, parser_metrics in metrics.items():
+        parser_label = f'parser="{_escape_label(name)}"'
+        for phase, phase_time in parser_metrics["phases"].items():
+            labels = f'{parser_label},phase="{_escape_label(phase)}"'
+            samples["news_parser_phase_seconds_total"][1].append((labels, phase_time["seconds"]))
+            samples["news_parser_phase_calls_total"][1].append((labels, phase_time["calls"]))
+        for counter, value in parser_metrics["counters"].items():
+            samples["news_parser_events_total"][1].append((f'{parser_label},event="{_escape_label(counter)}"', value))
+        for peak, value in parser_metrics["peaks"].items():
+            samples["news_parser_peak"][1].append((f'{parser_label},name="{_escape_label(peak)}"', value))
+        samples["news_parser_pages_per_second"][1].append((parser_label, parser_metrics["pages_per_second"]))
+        samples["news_parser_elapsed_seconds"][1].append((parser_label, parser_metrics["elapsed_seconds"]))
+    lines = []
+    for metric, (metric_type, metric_samples) in samples.items():
+        lines.append(f"# TYPE {metric} {metric_type}")
+        lines += [f"{metric}{{{labels}}} {value}" for labels, value in metric_samples]
+    return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,59 @@
+import time
+from typing import Callable, Optional
+
+from selenium.common.exceptions import ElementClickInterceptedException, TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from parsers.metrics import ParserMetrics
+
+
+# Paces the "More" clicks and scrolls of a listing page. Instead of a fixed sleep before every step, the pacer waits
+# until the new cards appear and keeps a delay between the steps in the AIMD way: the delay grows multiplicatively
+# when the site blocks a click, answers slowly or doesn't load the cards, and shrinks additively after fast steps.
+class AdaptivePacer:
+
+    MIN_DELAY = 0  # seconds
+    MAX_DELAY = 30  # seconds
+    BACKOFF_DELAY = 1  # seconds, the first delay after a block
+    BACKOFF_FACTOR = 2
+    DECREASE_STEP = 0.25  # seconds
+    SLOW_LATENCY = 5  # seconds, slower steps increase the delay as blocks do
+    LOAD_TIMEOUT = 20  # seconds to wait for the new cards
+    POLL_INTERVAL = 0.2  # seconds
+    ATTEMPTS_NUM = 3
+
+    def __init__(self, name: str = "Pacer", metrics: Optional[ParserMetrics] = None):
+        self.name = name
+        self.metrics = metrics if metrics is not None else ParserMetrics()
+        self.delay = self.MIN_DELAY
+
+    def load_more(self, driver, load: Callable, count_cards: Callable[..., int]) -> bool:
+        # Runs one step of the listing, e.g. a "More" click, and waits until the cards counter grows.
+        # Returns False if the cards are not loaded after all attempts.
+        cards_num = count_cards(driver)
+        for _ in range(self.ATTEMPTS_NUM):
+            with self.metrics.timer("sleep"):
+                time.sleep(self.delay)
+            start_time = time.monotonic()
+            try:
+                with self.metrics.timer("load_more"):
+                    load(driver)
+                    WebDriverWait(driver, self.LOAD_TIMEOUT, poll_frequency=self.POLL_INTERVAL).until(
+                        lambda d: count_cards(d) > cards_num)
+            except (ElementClickInterceptedException, TimeoutException):
+                self.metrics.increment("blocks")
+                self.on_block()
+                continue
+            self.on_success(time.monotonic() - start_time)
+            return True
+        return False
+
+    def on_success(self, latency: float):
+        if latency > self.SLOW_LATENCY:
+            self.on_block()
+        else:
+            self.delay = max(self.MIN_DELAY, self.delay - self.DECREASE_STEP)
+
+    def on_block(self):
+        self.delay = min(self.MAX_DELAY, max(self.BACKOFF_DELAY, self.delay * self.BACKOFF_FACTOR))
+        print(f"[{self.name}][Warning] The site is slowing down, the delay is {self.delay:.1f} s ...")
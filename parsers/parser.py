@@ -1,12 +1,47 @@
-from copy import deepcopy
-from dataclasses import dataclass, field
+import heapq
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
 from datetime import datetime
-from typing import Dict, List
+from enum import Enum
+from functools import partial
+from itertools import tee
+from queue import Full, Queue
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Sized, Tuple
+from urllib.parse import urlparse
 
 import pandas as pd
+import pyarrow as pa
+import requests
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+from requests import RequestException
+from selenium import webdriver
+from selenium.common.exceptions import (ElementClickInterceptedException, NoSuchElementException, TimeoutException,
+                                        WebDriverException)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from tqdm import tqdm
 
+from global_data import CHROMEDRIVER_BIN
+from parsers.archive import PageArchive
+from parsers.cache import PageCache
+from parsers.dataset import entities_to_table
+from parsers.dedup import DedupIndex
+from parsers.discovery import discover_feed_news, DiscoveredNews, Discovery
+from parsers.journal import CrawlJournal
+from parsers.metrics import ParserMetrics
+from parsers.pacing import AdaptivePacer
+from parsers.retry import classify_failure, FailureKind, PageFailure, RetryQueue, TRANSIENT_FAILURES
+from parsers.sinks import ArrowSink, CsvSink, DatasetSink, JsonlSink, ParquetSink
+from parsers.urls import normalize_url
 
-@dataclass
+
+# Slotted to keep large collections compact, the tags and metadata are interned as they repeat a lot
+@dataclass(slots=True)
 class ParseEntity:
     id: int
     date: datetime
@@ -16,52 +51,1009 @@ class ParseEntity:
     tags: List = field(default_factory=list)
     metadata: List = field(default_factory=list)
 
-    def to_dict(self, ru_date_format: bool = True, list_sep: str = ',', stop_symbols: List = None) -> Dict:
+    def __post_init__(self):
+        self.tags = [sys.intern(tag) for tag in self.tags]
+        self.metadata = [sys.intern(item) for item in self.metadata]
+
+    def to_dict(self, ru_date_format: bool = True, list_sep: Optional[str] = ',', stop_symbols: List = None) -> Dict:
+        # A shallow copy is enough: strings are immutable and the lists are joined or copied below.
+        # With list_sep=None tags and metadata stay lists.
         stop_symbols = stop_symbols if stop_symbols else []
-        result = deepcopy(self.__dict__)
+        result = {name: getattr(self, name) for name in self.__slots__}
         date_format = "%d.%m.%Y %H:%M" if ru_date_format else "%m.%d.%Y %H:%M"
         result['date'] = result['date'].strftime(date_format) if result['date'] is not None else ""
         for stop_symbol in stop_symbols:
             result['title'] = result['title'].replace(stop_symbol, ' ')
             result['text'] = result['text'].replace(stop_symbol, ' ')
-        result['tags'] = list_sep.join(result['tags'])
-        result['metadata'] = list_sep.join(result['metadata'])
+        result['tags'] = list_sep.join(result['tags']) if list_sep is not None else list(result['tags'])
+        result['metadata'] = list_sep.join(result['metadata']) if list_sep is not None else list(result['metadata'])
         return result
 
 
 class ParseResult:
-    def __init__(self):
+
+    HEAD_LINKS_NUM = 100
+
+    def __init__(self, sink=None, dedup_index: Optional[DedupIndex] = None, metrics: Optional[ParserMetrics] = None):
+        # With a sink the entities are streamed to it and aren't kept in `entities`. Ids continue the ids
+        # already written to the sink, so several results can be streamed to the same file.
         self.entities: Dict[int, ParseEntity] = dict()
+        # Added entities are recorded in the dedup index, reprints of the indexed texts are flagged in metadata
+        self.dedup_index = dedup_index
+        self.metrics = metrics if metrics is not None else ParserMetrics()
+        # Merged results with the offset of their ids, see __iadd__
+        self.__segments: List[Tuple[int, ParseResult]] = []
+        self.sink = sink
+        self.id_offset = sink.entities_num if sink is not None else 0
+        self.streamed_num = 0
+        # Summary of all added entities, available in both modes
+        self.head_links: List[str] = []
+        self.max_date: Optional[datetime] = None
+
+    def __len__(self):
+        return len(self.entities) + self.streamed_num + sum(len(segment) for _, segment in self.__segments)
 
     def __iadd__(self, other):
-        start_index = len(self.entities)
-        for entity in other.entities.values():
-            entity = deepcopy(entity)
-            entity.id += start_index
-            self.add_entity(entity)
+        # `other` is moved into this result as is: its entities aren't copied and get the offset `len(self)`
+        # to their ids only when they are read from this result. The streamed entities are already in the sink,
+        # only their number is merged.
+        if other.sink is not None:
+            self.streamed_num += other.streamed_num
+        elif len(other):
+            self.__segments.append((len(self), other))
+        self.head_links += other.head_links[:self.HEAD_LINKS_NUM - len(self.head_links)]
+        if other.max_date is not None and (self.max_date is None or other.max_date > self.max_date):
+            self.max_date = other.max_date
         return self
 
     def add_entity(self, entity: ParseEntity):
+        with self.metrics.timer("export"):
+            self.__add_entity(entity)
+
+    def __add_entity(self, entity: ParseEntity):
+        if self.dedup_index is not None:
+            duplicate_link = self.dedup_index.add(entity.link, entity.text)
+            if duplicate_link is not None:
+                entity.metadata.append(f"near_duplicate: {duplicate_link}")
+                self.metrics.increment("near_duplicates")
+        if len(self.head_links) < self.HEAD_LINKS_NUM:
+            self.head_links.append(entity.link)
+        if entity.date is not None and (self.max_date is None or entity.date > self.max_date):
+            self.max_date = entity.date
+        if self.sink is not None:
+            entity.id += self.id_offset
+            self.sink.write(entity)
+            self.streamed_num += 1
+            return
         self.entities[entity.id] = entity
 
     def pop_entity(self, entity_id: int) -> ParseEntity:
-        return self.entities.pop(entity_id)
+        if entity_id in self.entities:
+            return self.entities.pop(entity_id)
+        offset, segment = self.__find_segment(entity_id)
+        return replace(segment.pop_entity(entity_id - offset), id=entity_id)
 
     def get_entity(self, entity_id: int) -> ParseEntity:
-        return self.entities[entity_id]
+        if entity_id in self.entities:
+            return self.entities[entity_id]
+        offset, segment = self.__find_segment(entity_id)
+        return replace(segment.get_entity(entity_id - offset), id=entity_id)
+
+    def iter_entities(self) -> Iterator[ParseEntity]:
+        # Entities in the order of their ids. The merged ones are shallow copies with the shifted id.
+        if not self.__segments:
+            return iter(self.entities.values())
+        parts = [iter(self.entities.values()), ]
+        parts += [self.__shift_ids(segment.iter_entities(), offset) for offset, segment in self.__segments]
+        return heapq.merge(*parts, key=lambda entity: entity.id)
+
+    def stream_to(self, sink):
+        for entity in self.iter_entities():
+            sink.write(entity)
+        sink.flush()
 
     def to_csv(self, save_path: str, ru_date_format=True, sep=';'):
-        df = pd.DataFrame([entity.to_dict(ru_date_format, stop_symbols=[sep, ]) for entity in self.entities.values()])
-        df.to_csv(save_path, index=False, sep=sep)
+        with CsvSink(save_path, ru_date_format, sep) as sink:
+            self.stream_to(sink)
+
+    def to_jsonl(self, save_path: str):
+        with JsonlSink(save_path) as sink:
+            self.stream_to(sink)
+
+    def to_arrow(self) -> pa.Table:
+        return entities_to_table(self.iter_entities())
+
+    def to_parquet(self, save_path: str, partitioned: bool = False):
+        # Partitioned output is a dataset directory with source=<site>/day=<yyyy-mm-dd> subdirectories
+        with (DatasetSink(save_path) if partitioned else ParquetSink(save_path)) as sink:
+            self.stream_to(sink)
+
+    def to_feather(self, save_path: str):
+        with ArrowSink(save_path) as sink:
+            self.stream_to(sink)
 
     def to_excel(self, save_path: str, ru_date_format=True):
-        df = pd.DataFrame([entity.to_dict(ru_date_format) for entity in self.entities.values()])
+        df = pd.DataFrame([entity.to_dict(ru_date_format) for entity in self.iter_entities()])
         df.to_excel(save_path, index=False)
 
+    def __find_segment(self, entity_id: int) -> Tuple[int, "ParseResult"]:
+        for offset, segment in reversed(self.__segments):
+            if offset <= entity_id:
+                return offset, segment
+        raise KeyError(entity_id)
+
+    @staticmethod
+    def __shift_ids(entities: Iterator[ParseEntity], offset: int) -> Iterator[ParseEntity]:
+        for entity in entities:
+            yield replace(entity, id=entity.id + offset)
+
+
+# Token bucket per host (one token every `interval` seconds, up to `burst` saved tokens)
+# plus a cap on the simultaneous connections over all hosts. The interval of a host backs off in the AIMD way:
+# it grows multiplicatively when the host blocks the crawler or answers slowly, and shrinks additively back to
+# the interval of the parser after every loaded page.
+class HostRateLimiter:
+
+    CONNECTIONS_LIMIT = 16
+    BACKOFF_INTERVAL = 1  # seconds, the first interval after a block
+    BACKOFF_FACTOR = 2
+    MAX_INTERVAL = 60  # seconds
+    RECOVERY_STEP = 0.25  # seconds
+    SLOW_LATENCY = 10  # seconds, slower requests increase the interval as blocks do
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__buckets: Dict[str, Tuple[float, float]] = dict()
+        self.__intervals: Dict[str, float] = dict()  # backed off intervals of the hosts
+        self.__connections = threading.BoundedSemaphore(self.CONNECTIONS_LIMIT)
+
+    def set_connections_limit(self, connections_limit: int):
+        self.__connections = threading.BoundedSemaphore(connections_limit)
+
+    def wait(self, url: str, interval: float, burst: int = 1):
+        host = urlparse(url).netloc
+        with self.__lock:
+            if host in self.__intervals:
+                # No bursts until the host recovers
+                interval, burst = max(interval, self.__intervals[host]), 1
+            now = time.monotonic()
+            tokens, update_time = self.__buckets.get(host, (burst, now))
+            # A negative balance is a reservation of the future tokens, so the threads sleep outside the lock
+            tokens = min(burst, tokens + (now - update_time) / interval) - 1 if interval > 0 else burst
+            self.__buckets[host] = (tokens, now)
+        if tokens < 0:
+            time.sleep(-tokens * interval)
+
+    @contextmanager
+    def connection(self, url: str, interval: float, burst: int = 1):
+        self.wait(url, interval, burst)
+        with self.__connections:
+            start_time = time.monotonic()
+            try:
+                yield
+            finally:
+                if time.monotonic() - start_time > self.SLOW_LATENCY:
+                    self.on_block(url, interval)
+
+    def on_block(self, url: str, interval: float):
+        host = urlparse(url).netloc
+        with self.__lock:
+            host_interval = max(interval, self.__intervals.get(host, 0), self.BACKOFF_INTERVAL / self.BACKOFF_FACTOR)
+            self.__intervals[host] = min(self.MAX_INTERVAL, host_interval * self.BACKOFF_FACTOR)
+            print(f"[HostRateLimiter][Warning] {host} is slowing down, the interval is "
+                  f"{self.__intervals[host]:.1f} s ...")
+
+    def on_success(self, url: str, interval: float):
+        host = urlparse(url).netloc
+        with self.__lock:
+            if host not in self.__intervals:
+                return
+            host_interval = self.__intervals[host] - self.RECOVERY_STEP
+            if host_interval <= interval:
+                del self.__intervals[host]
+            else:
+                self.__intervals[host] = host_interval
+
+
+# Shared by all parsers, so parsers running at the same time can't exceed the budget of a site together
+host_rate_limiter = HostRateLimiter()
+
+
+# Lazily creates up to `size` drivers and hands them out to the worker threads. A driver is replaced by a fresh one
+# after `max_pages` pages, so the memory of the long-living browsers stays capped, and right after it crashes.
+class DriverPool:
+    def __init__(self, create_driver: Callable, size: int, max_pages: Optional[int] = None):
+        self.size = size
+        self.max_pages = max_pages
+        self.__create_driver = create_driver
+        self.__condition = threading.Condition()
+        self.__drivers = []
+        self.__idle_drivers = deque()
+        self.__starting_num = 0  # slots reserved for the drivers being started
+        self.__pages_num = dict()
+
+    @contextmanager
+    def driver(self):
+        # The slot of a new driver is reserved under the lock, the browser is started outside of it, so the
+        # browsers start in parallel and the other threads return their drivers meanwhile
+        with self.__condition:
+            while not self.__idle_drivers and len(self.__drivers) + self.__starting_num >= self.size:
+                self.__condition.wait()
+            driver = self.__idle_drivers.popleft() if self.__idle_drivers else None
+            if driver is None:
+                self.__starting_num += 1
+        if driver is None:
+            driver = self.__start_driver()
+        crashed = False
+        try:
+            yield driver
+        except WebDriverException as e:
+            # Timeouts and missing elements are failures of the page, the other errors usually mean a crashed
+            # browser or a lost session, so the driver is replaced instead of failing the retries as well
+            crashed = not isinstance(e, (TimeoutException, NoSuchElementException))
+            raise
+        finally:
+            self.__release(driver, crashed)
+
+    def close(self):
+        with self.__condition:
+            for driver in self.__drivers:
+                self.__quit(driver)
+            self.__drivers = []
+            self.__idle_drivers = deque()
+            self.__pages_num = dict()
+
+    def __start_driver(self):
+        # Starts a driver in the slot reserved by the caller, the slot is freed if the browser fails to start
+        try:
+            driver = self.__create_driver()
+        except BaseException:
+            with self.__condition:
+                self.__starting_num -= 1
+                # A waiting thread starts its own driver in the freed slot
+                self.__condition.notify()
+            raise
+        with self.__condition:
+            self.__starting_num -= 1
+            self.__drivers.append(driver)
+        return driver
+
+    def __release(self, driver, crashed: bool = False):
+        with self.__condition:
+            if driver not in self.__drivers:  # the pool is already closed
+                return
+            self.__pages_num[driver] = self.__pages_num.get(driver, 0) + 1
+            if not crashed and (self.max_pages is None or self.__pages_num[driver] < self.max_pages):
+                self.__idle_drivers.append(driver)
+                self.__condition.notify()
+                return
+            # The slot of the recycled driver stays reserved for its replacement, so the pool never grows
+            del self.__pages_num[driver]
+            self.__drivers.remove(driver)
+            self.__starting_num += 1
+        self.__quit(driver)
+        new_driver = self.__start_driver()
+        with self.__condition:
+            self.__idle_drivers.append(new_driver)
+            self.__condition.notify()
+
+    @staticmethod
+    def __quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass  # the browser or its driver process has already crashed or was killed
+
+
+# Read-only element of a downloaded HTML document with the part of the Selenium WebElement interface
+# used by the parsers, so the same extraction code works for both fetch backends
+class HtmlElement:
+
+    BLOCK_TAGS = {"address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption",
+                  "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main",
+                  "nav", "ol", "p", "pre", "section", "table", "tr", "ul"}
+    SKIPPED_TAGS = {"noscript", "script", "style", "template"}
+
+    def __init__(self, tag: Tag):
+        self.tag = tag
+
+    @property
+    def text(self) -> str:
+        parts = []
+        self.__collect_text(self.tag, parts)
+        lines = (' '.join(line.split()) for line in ''.join(parts).split('\n'))
+        return '\n'.join(line for line in lines if line)
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        value = self.tag.get(name)
+        return ' '.join(value) if isinstance(value, list) else value
+
+    def find_element(self, by: str, value: str):
+        tag = self.tag.select_one(self.__to_css_selector(by, value))
+        if tag is None:
+            raise NoSuchElementException(f"Unable to locate element: {by}={value}")
+        return HtmlElement(tag)
+
+    def find_elements(self, by: str, value: str) -> List:
+        return [HtmlElement(tag) for tag in self.tag.select(self.__to_css_selector(by, value))]
+
+    @classmethod
+    def __collect_text(cls, tag: Tag, parts: List[str]):
+        for child in tag.children:
+            if isinstance(child, Comment):
+                continue
+            if isinstance(child, NavigableString):
+                # Line breaks of the HTML source are spaces as in the browser, only the blocks start new lines
+                parts.append(str(child).replace('\r', ' ').replace('\n', ' '))
+            elif isinstance(child, Tag) and child.name not in cls.SKIPPED_TAGS:
+                is_block = child.name in cls.BLOCK_TAGS
+                if is_block:
+                    parts.append('\n')
+                cls.__collect_text(child, parts)
+                if is_block:
+                    parts.append('\n')
+
+    @staticmethod
+    def __to_css_selector(by: str, value: str) -> str:
+        if by == By.CLASS_NAME:
+            return '.' + value.strip()
+        if by == By.ID:
+            return '#' + value
+        if by in (By.TAG_NAME, By.CSS_SELECTOR):
+            return value
+        raise ValueError(f"Locator strategy {by} isn't supported for downloaded pages")
+
+
+class HtmlPage(HtmlElement):
+    def __init__(self, html: str, url: str = ""):
+        self.page_source = html
+        self.current_url = url
+        self.__tag: Optional[Tag] = None
+
+    @property
+    def tag(self) -> Tag:
+        # The document is parsed on the first lookup, pages read only through page_source (feeds) are never parsed
+        if self.__tag is None:
+            self.__tag = BeautifulSoup(self.page_source, "html.parser")
+        return self.__tag
+
+
+class FetchBackend(str, Enum):
+    SELENIUM = "selenium"
+    HTTP = "http"
+
+    def __str__(self):
+        return self.value
+
+
+class PageLoadStrategy(str, Enum):
+    NORMAL = "normal"  # wait for the load event: all images, frames and scripts
+    EAGER = "eager"  # wait for DOMContentLoaded
+    NONE = "none"  # return right after the navigation starts
+
+    def __str__(self):
+        return self.value
+
+
+class SeleniumFetcher:
+    # Transferred bytes of the loaded document and the JS heap of the page, read by one script call
+    PAGE_STATS_SCRIPT = """
+const navigation = performance.getEntriesByType("navigation")[0];
+return [navigation ? navigation.transferSize : 0, performance.memory ? performance.memory.usedJSHeapSize : 0];
+"""
+
+    # True as soon as the element of the news text has some text
+    BODY_READY_SCRIPT = """
+const element = document.querySelector(arguments[0]);
+return element !== null && element.textContent.trim().length > 0;
+"""
+    POLL_INTERVAL = 0.2  # seconds
+
+    def __init__(self, create_driver: Callable, size: int, request_interval: float, request_burst: int = 1,
+                 max_pages: Optional[int] = None, metrics: Optional[ParserMetrics] = None,
+                 page_deadline: Optional[float] = None, body_selector: Optional[str] = None):
+        self.driver_pool = DriverPool(create_driver, size, max_pages)
+        self.request_interval = request_interval
+        self.request_burst = request_burst
+        self.metrics = metrics if metrics is not None else ParserMetrics()
+        self.page_deadline = page_deadline
+        self.body_selector = body_selector
+
+    @contextmanager
+    def page(self, link: str):
+        with self.driver_pool.driver() as driver:
+            start_time = time.perf_counter()
+            with host_rate_limiter.connection(link, self.request_interval, self.request_burst):
+                self.metrics.add_time("wait", time.perf_counter() - start_time)
+                with self.metrics.timer("fetch"):
+                    self.__load(driver, link)
+            transfer_size, heap_size = driver.execute_script(self.PAGE_STATS_SCRIPT)
+            self.metrics.increment("bytes", transfer_size or 0)
+            self.metrics.update_peak("driver_js_heap_bytes", heap_size or 0)
+            yield driver
+
+    def close(self):
+        self.driver_pool.close()
+
+    def __load(self, driver, link: str):
+        # Within the deadline the page is loaded only until the news text appears, then the rest of it (ads,
+        # counters, widgets) is stopped. The page load timeout of the driver is the same deadline.
+        if self.body_selector is None or self.page_deadline is None:
+            driver.get(link)
+            return
+        deadline = time.monotonic() + self.page_deadline
+        try:
+            driver.get(link)
+        except TimeoutException:
+            self.metrics.increment("load_timeouts")
+        WebDriverWait(driver, max(0.0, deadline - time.monotonic()), poll_frequency=self.POLL_INTERVAL).until(
+            lambda d: d.execute_script(self.BODY_READY_SCRIPT, self.body_selector),
+            f"No news text {self.body_selector} on {link} within {self.page_deadline} s")
+        driver.execute_script("window.stop();")
+
+
+# Plain HTTP download for server-rendered pages: no browser, the page is parsed into an HtmlPage
+class HttpFetcher:
+
+    TIMEOUT = 30  # seconds
+    HEADERS = {
+        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                      "Chrome/124.0.0.0 Safari/537.36",
+        "Accept-Language": "ru-RU,ru;q=0.9",
+    }
+
+    def __init__(self, request_interval: float, request_burst: int = 1, metrics: Optional[ParserMetrics] = None,
+                 timeout: float = TIMEOUT):
+        self.request_interval = request_interval
+        self.request_burst = request_burst
+        self.metrics = metrics if metrics is not None else ParserMetrics()
+        self.timeout = timeout
+        self.__local = threading.local()
+        self.__lock = threading.Lock()
+        self.__sessions = []
+
+    @contextmanager
+    def page(self, link: str):
+        start_time = time.perf_counter()
+        try:
+            with host_rate_limiter.connection(link, self.request_interval, self.request_burst):
+                self.metrics.add_time("wait", time.perf_counter() - start_time)
+                with self.metrics.timer("fetch"):
+                    response = self.__get_session().get(link, timeout=self.timeout)
+        except requests.Timeout as e:
+            raise TimeoutException(f"Timed out receiving {link}") from e
+        self.metrics.increment("bytes", len(response.content))
+        response.raise_for_status()
+        if "charset" not in response.headers.get("Content-Type", ""):
+            response.encoding = response.apparent_encoding
+        yield HtmlPage(response.text, response.url)
+
+    def close(self):
+        with self.__lock:
+            for session in self.__sessions:
+                session.close()
+            self.__sessions = []
+
+    def __get_session(self) -> requests.Session:
+        session = getattr(self.__local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(self.HEADERS)
+            self.__local.session = session
+            with self.__lock:
+                self.__sessions.append(session)
+        return session
+
+
+# Serves the news pages from the page cache and stores the pages loaded by the wrapped fetcher
+class CachingFetcher:
+    def __init__(self, fetcher, page_cache: PageCache, metrics: Optional[ParserMetrics] = None):
+        self.fetcher = fetcher
+        self.page_cache = page_cache
+        self.metrics = metrics if metrics is not None else ParserMetrics()
+
+    @contextmanager
+    def page(self, link: str):
+        with self.metrics.timer("cache"):
+            html = self.page_cache.get(link)
+        if html is not None:
+            self.metrics.increment("cache_hits")
+            yield HtmlPage(html, link)
+            return
+        with self.fetcher.page(link) as page:
+            yield page
+            # Only the pages parsed without errors are cached, the failed ones are loaded again on retry
+            self.page_cache.put(link, page.page_source)
+
+    def close(self):
+        self.fetcher.close()
+
+
+# Appends every page given by the wrapped fetcher, loaded or cached, to the page archive, before it is parsed: the
+# pages which the parser fails to read (e.g. after a change of the layout) are exactly the ones to be extracted again
+class ArchivingFetcher:
+    def __init__(self, fetcher, page_archive: PageArchive, parser: str, metrics: Optional[ParserMetrics] = None):
+        self.fetcher = fetcher
+        self.page_archive = page_archive
+        self.parser = parser
+        self.metrics = metrics if metrics is not None else ParserMetrics()
+
+    @contextmanager
+    def page(self, link: str):
+        with self.fetcher.page(link) as page:
+            with self.metrics.timer("archive"):
+                self.page_archive.add_page(self.parser, link, page.page_source)
+            yield page
+
+    def close(self):
+        self.fetcher.close()
+
+
+# Serves the news pages from the page archive only, the sites aren't requested
+class ArchiveFetcher:
+    def __init__(self, page_archive: PageArchive, metrics: Optional[ParserMetrics] = None):
+        self.page_archive = page_archive
+        self.metrics = metrics if metrics is not None else ParserMetrics()
+
+    @contextmanager
+    def page(self, link: str):
+        with self.metrics.timer("fetch"):
+            record = self.page_archive.find_page(link)
+            if record is None:
+                raise PageFailure(FailureKind.HTTP_ERROR, f"No archived page {link}")
+            html = self.page_archive.read_page(record)
+        self.metrics.increment("bytes", record.length)
+        yield HtmlPage(html, link)
+
+    def close(self):
+        pass
+
+
+# Resources the parsers never read: images, fonts, media and the ad and analytics hosts. Stylesheets are kept,
+# the "More" buttons are clicked by their position on the page.
+BLOCKED_URLS = [
+    "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*",
+    "*.woff*", "*.ttf*", "*.otf*", "*.eot*",
+    "*.mp4*", "*.webm*", "*.mp3*", "*.m3u8*",
+    "*doubleclick.net*", "*googlesyndication.com*", "*googletagmanager.com*", "*google-analytics.com*",
+    "*mc.yandex.ru*", "*an.yandex.ru*", "*yandex.ru/ads*", "*adfox.ru*", "*adriver.ru*", "*top-fwz1.mail.ru*",
+    "*tns-counter.ru*", "*mediametrics.ru*",
+]
+WINDOW_SIZE = "1920,1080"
+
+EXTRACT_CARDS_SCRIPT = """
+const [cardSelector, fields, start, prune] = arguments;
+const cards = Array.from(document.querySelectorAll(cardSelector)).slice(start);
+const values = cards.map(card => {
+    const values = {};
+    for (const [name, [selector, property]] of Object.entries(fields)) {
+        const element = selector ? card.querySelector(selector) : card;
+        const value = element ? element[property] : null;
+        values[name] = value == null ? null : String(value).trim();
+    }
+    return values;
+});
+if (prune) {
+    // Removed by the same call, so the cards loaded in the meantime are neither lost nor read twice
+    cards.forEach(card => card.remove());
+}
+return values;
+"""
+
 
 class Parser:
+
+    WORKERS_NUM = 4
+    DOMAIN_REQUEST_INTERVAL = 1  # seconds
+    DOMAIN_REQUEST_BURST = 1
+    FETCH_BACKEND = FetchBackend.SELENIUM  # backend for the news pages, listings always need a browser
+    CARD_SELECTOR = "a"  # CSS selector of the news cards on the listing page
+    DISCOVERY = Discovery.LISTING  # how the links of the fresh news are found
+    DISCOVERY_FEEDS: List[str] = []  # RSS feeds of the site for the feed discovery
+    HEADLESS = True
+    BLOCK_RESOURCES = True
+    DRIVER_PAGES_NUM = 100  # news pages loaded by one browser before it is replaced by a fresh one
+    BLOCK_STATUS_CODES = {403, 429}  # HTTP answers of a site refusing to serve the crawler
+    RETRY_WORKERS_NUM = 1  # workers of the retry lane
+    IN_FLIGHT_PAGES_NUM = 4  # news pages waiting per worker for their first load
+    PIPELINE_QUEUE_SIZE = 100  # discovered news waiting for their pages in the pipelined mode
+    PIPELINE_POLL_INTERVAL = 0.5  # seconds
+    PAGE_LOAD_STRATEGY = PageLoadStrategy.EAGER  # of the news pages, the listings are loaded completely
+    PAGE_DEADLINE = 30  # seconds to load a news page
+    LISTING_LOAD_TIMEOUT = 60  # seconds, the listing page is used as it is after the timeout
+    BODY_SELECTOR: Optional[str] = None  # CSS selector of the news text, the news page is ready when it has text
+    PRUNE_LISTING = False  # remove the read cards from the listing page, the site scripts must tolerate it
+    # Card field name -> (CSS selector inside the card or None for the card itself, DOM property to read)
+    CARD_FIELDS: Dict[str, Tuple[Optional[str], str]] = {"link": (None, "href"), "title": (None, "innerText"), }
+    NEWS_LINK_INDEX = 1  # position of the news link in the rows of the titles phase
+
     def __init__(self, start_url: str = ""):
         self.start_url = start_url
+        self.workers_num = self.WORKERS_NUM
+        self.fetch_backend = self.FETCH_BACKEND
+        self.discovery = self.DISCOVERY
+        self.pipelined = False
+        self.prune_listing = self.PRUNE_LISTING
+        self.page_load_strategy = self.PAGE_LOAD_STRATEGY
+        self.page_deadline = self.PAGE_DEADLINE
+        self.headless = self.HEADLESS
+        self.block_resources = self.BLOCK_RESOURCES
+        self.page_cache: Optional[PageCache] = None
+        self.page_archive: Optional[PageArchive] = None
+        # Archive of the previous crawls to read the news pages from instead of the sites
+        self.replay_archive: Optional[PageArchive] = None
+        self.show_progress = True
+        # High-water marks of the incremental mode: normalized links and the date of the already parsed news
+        self.known_links: Set[str] = set()
+        self.last_news_date: Optional[datetime] = None
+        self.journal: Optional[CrawlJournal] = None
+        self.result_sink = None
+        self.dedup_index: Optional[DedupIndex] = None
+        self.metrics = ParserMetrics()
+        self.__shared_fetcher = None
+
+    @property
+    def state_key(self) -> str:
+        return type(self).__name__
 
     def parse(self, news_num: int) -> ParseResult:
-        pass
+        if self.pipelined:
+            return self.parse_texts(self.pipe_titles(news_num))
+        news_data = self.parse_titles(news_num)
+        return self.parse_texts(news_data)
+
+    def parse_titles(self, news_num: int) -> List:
+        news_data = self.restore_news_data()
+        if news_data is None:
+            news_data = list(self.iter_titles(news_num))
+            self.checkpoint_news_data(news_data)
+        return news_data
+
+    def iter_titles(self, news_num: int) -> Iterator[List]:
+        # News list of the site: a row with the link and the listing data of every fresh news
+        raise NotImplementedError
+
+    def pipe_titles(self, news_num: int) -> Iterator[List]:
+        # Pipelined mode: the titles are discovered by a separate thread and handed over through a bounded queue
+        # as soon as they are found, so the news pages are loaded while the listing is still growing
+        news_data = self.restore_news_data()
+        if news_data is not None:
+            yield from news_data
+            return
+        news_queue = Queue(maxsize=self.PIPELINE_QUEUE_SIZE)
+        stop_event = threading.Event()
+        producer = threading.Thread(target=self.__produce_titles, args=(news_num, news_queue, stop_event),
+                                    daemon=True)
+        producer.start()
+        news_data = []
+        try:
+            while (row := news_queue.get()) is not None:
+                if isinstance(row, Exception):
+                    raise row
+                news_data.append(row)
+                yield row
+        finally:
+            stop_event.set()
+            producer.join()
+        self.checkpoint_news_data(news_data)
+
+    def __produce_titles(self, news_num: int, news_queue: Queue, stop_event: threading.Event):
+        def put(item) -> bool:
+            # The discovery waits while the queue is full and stops as soon as the consumer is gone
+            while not stop_event.is_set():
+                try:
+                    news_queue.put(item, timeout=self.PIPELINE_POLL_INTERVAL)
+                    return True
+                except Full:
+                    continue
+            return False
+
+        titles = self.iter_titles(news_num)
+        try:
+            for row in titles:
+                if not put(row):
+                    return
+            put(None)
+        except Exception as e:
+            put(e)
+        finally:
+            titles.close()
+
+    def parse_texts(self, news_data: Iterable[List]) -> ParseResult:
+        raise NotImplementedError
+
+    def create_driver(self, page_load_strategy: PageLoadStrategy = PageLoadStrategy.NORMAL,
+                      page_load_timeout: Optional[float] = None):
+        with self.metrics.timer("driver_start"):
+            driver = self.__create_driver(page_load_strategy)
+        if page_load_timeout is not None:
+            driver.set_page_load_timeout(page_load_timeout)
+        return driver
+
+    def __create_driver(self, page_load_strategy: PageLoadStrategy):
+        options = webdriver.ChromeOptions()
+        options.page_load_strategy = str(page_load_strategy)
+        if self.headless:
+            options.add_argument("--headless=new")
+        options.add_argument(f"--window-size={WINDOW_SIZE}")
+        options.add_argument("--disable-dev-shm-usage")  # /dev/shm of containers is too small for many browsers
+        if self.block_resources:
+            options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        # Without CHROMEDRIVER_BIN the Selenium Manager finds or downloads a matching chromedriver
+        driver = webdriver.Chrome(options=options, service=webdriver.ChromeService(executable_path=CHROMEDRIVER_BIN))
+        if self.block_resources:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+        return driver
+
+    @contextmanager
+    def listing_driver(self):
+        # The browser of the listing page is quit as soon as the titles are parsed, even after an error
+        driver = self.create_driver(PageLoadStrategy.NORMAL, self.LISTING_LOAD_TIMEOUT)
+        try:
+            with self.metrics.timer("titles"):
+                yield driver
+        finally:
+            driver.quit()
+
+    def load_listing_page(self, driver, url: str):
+        # A hung ad or counter script doesn't stop the listing, the page is stopped and used as it is
+        try:
+            driver.get(url)
+        except TimeoutException:
+            print(f"[{type(self).__name__}][Warning] The listing page is still loading after "
+                  f"{self.LISTING_LOAD_TIMEOUT} s, it is stopped ...")
+            driver.execute_script("window.stop();")
+
+    def is_known_news(self, link: str) -> bool:
+        return normalize_url(link) in self.known_links
+
+    def count_cards(self, driver) -> int:
+        return driver.execute_script("return document.querySelectorAll(arguments[0]).length;", self.CARD_SELECTOR)
+
+    def create_pacer(self) -> AdaptivePacer:
+        return AdaptivePacer(type(self).__name__, self.metrics)
+
+    def extract_cards(self, driver, news_num: Optional[int] = None, start: int = 0) -> List[Dict[str, Optional[str]]]:
+        # All fields of all cards starting from the `start` one are read by one script call instead of a WebDriver
+        # round trip for every field of every card. Missing fields are None, cards without a link are skipped.
+        cards = self.__read_cards(driver, start, prune=False)
+        cards = [card for card in cards if card.get("link")]
+        return cards if news_num is None else cards[:news_num]
+
+    def harvest_cards(self, driver, news_num: int, load_more: Callable) -> Iterator[Dict[str, Optional[str]]]:
+        # Yields the cards of the listing page as soon as they are loaded: the new cards are read after every
+        # "More" click or scroll, until `news_num` cards are read or the site stops loading them.
+        # With `prune_listing` the read cards are removed from the page, so the page doesn't grow with the listing
+        # depth, and the cost of every click, layout and read stays the same.
+        pacer = self.create_pacer()
+        read_num = cards_num = 0
+        progress_bar = tqdm(total=news_num)
+        try:
+            while True:
+                start = 0 if self.prune_listing else read_num
+                cards = self.__read_cards(driver, start, self.prune_listing)
+                read_num += len(cards)
+                self.metrics.update_peak("listing_cards", start + len(cards))  # cards on the page at once
+                for card in cards:
+                    if not card.get("link"):
+                        continue
+                    yield card
+                    cards_num += 1
+                    progress_bar.update(1)
+                    if cards_num >= news_num:
+                        return
+                if not pacer.load_more(driver, load_more, self.count_cards):
+                    print(f"[{type(self).__name__}][Warning] No more news are loaded ...")
+                    return
+        except (ElementClickInterceptedException, NoSuchElementException):
+            print(f"[{type(self).__name__}][Warning] Access to the button has been blocked ...")
+        finally:
+            progress_bar.close()
+
+    def __read_cards(self, driver, start: int, prune: bool) -> List[Dict[str, Optional[str]]]:
+        with self.metrics.timer("cards"):
+            return driver.execute_script(EXTRACT_CARDS_SCRIPT, self.CARD_SELECTOR, self.CARD_FIELDS, start, prune)
+
+    def discover_news(self, news_num: int) -> Optional[List[DiscoveredNews]]:
+        # Feed discovery: a few plain HTTP requests instead of a listing page growing with every "More" click.
+        # None if the feeds don't reach `news_num` news, the deeper crawls need the listing.
+        fetcher = HttpFetcher(self.DOMAIN_REQUEST_INTERVAL, self.DOMAIN_REQUEST_BURST, self.metrics)
+        try:
+            with self.metrics.timer("titles"):
+                news = discover_feed_news(fetcher, self.DISCOVERY_FEEDS)
+        finally:
+            fetcher.close()
+        fresh_news = []
+        for item in news:
+            if self.is_known_news(item.link) or (self.last_news_date is not None and item.date is not None
+                                                 and item.date < self.last_news_date):
+                # The incremental crawl has reached the news of the previous run, fewer news are expected
+                return fresh_news[:news_num]
+            fresh_news.append(item)
+        if len(fresh_news) < news_num:
+            print(f"[{type(self).__name__}][Warning] The feeds have only {len(fresh_news)} of {news_num} news, "
+                  f"the listing is used ...")
+            return None
+        return fresh_news[:news_num]
+
+    def restore_news_data(self) -> Optional[List]:
+        if self.journal is None:
+            return None
+        news_data = self.journal.restore_news_data()
+        if news_data is not None:
+            print(f"[{type(self).__name__}] Resume with {len(news_data)} news from {self.journal.path} ...")
+        return news_data
+
+    def checkpoint_news_data(self, news_data: List):
+        if self.journal is not None:
+            self.journal.add_news_data(news_data)
+
+    def create_parse_result(self) -> ParseResult:
+        return ParseResult(self.result_sink, self.dedup_index, self.metrics)
+
+    def create_fetcher(self):
+        if self.replay_archive is not None:
+            return ArchiveFetcher(self.replay_archive, self.metrics)
+        if self.fetch_backend == FetchBackend.HTTP:
+            fetcher = HttpFetcher(self.DOMAIN_REQUEST_INTERVAL, self.DOMAIN_REQUEST_BURST, self.metrics,
+                                  self.page_deadline)
+        else:
+            fetcher = SeleniumFetcher(partial(self.create_driver, self.page_load_strategy, self.page_deadline),
+                                      self.workers_num, self.DOMAIN_REQUEST_INTERVAL, self.DOMAIN_REQUEST_BURST,
+                                      self.DRIVER_PAGES_NUM, self.metrics, self.page_deadline, self.BODY_SELECTOR)
+        if self.page_cache is not None:
+            fetcher = CachingFetcher(fetcher, self.page_cache, self.metrics)
+        # The archive wraps the cache, so the pages served from the cache are archived along with their rows too
+        if self.page_archive is not None:
+            fetcher = ArchivingFetcher(fetcher, self.page_archive, self.state_key, self.metrics)
+        return fetcher
+
+    @contextmanager
+    def shared_fetcher(self):
+        # The news pages of all parses inside are loaded by one fetcher, e.g. the browsers stay warm between the
+        # batches of a frontier worker instead of being started for every batch
+        self.__shared_fetcher = self.create_fetcher()
+        try:
+            yield self.__shared_fetcher
+        finally:
+            fetcher, self.__shared_fetcher = self.__shared_fetcher, None
+            fetcher.close()
+
+    def parse_news_page(self, page) -> Tuple:
+        raise NotImplementedError
+
+    def parse_news_rows(self, news_data: Iterable[List], link_index: int) -> Iterator[List]:
+        # Rows of the news extended by the values of their pages, the rows of the failed pages are skipped.
+        # The rows are read lazily, so in the pipelined mode the pages are loaded while the titles are discovered.
+        rows, link_rows = tee(news_data)
+        news_num = len(news_data) if isinstance(news_data, Sized) else None
+        news_pages = self.parse_news_pages((self.__archive_news_row(row, link_index) for row in link_rows), news_num)
+        return (row + list(page) for row, page in zip(rows, news_pages) if page is not None)
+
+    def __archive_news_row(self, row: List, link_index: int) -> str:
+        # The rows are archived along with the pages, the news are extracted again from both of them
+        if self.page_archive is not None:
+            self.page_archive.add_news_row(self.state_key, row[link_index], row)
+        return row[link_index]
+
+    def parse_news_pages(self, links: Iterable[str], links_num: Optional[int] = None) -> Iterator[Optional[Tuple]]:
+        # Pages are loaded by `workers_num` workers in parallel and yielded as soon as they are ready in the order
+        # of `links`. The links are read lazily and the ready pages are yielded between them. A page that failed
+        # to load after all retries gives None. The pages checkpointed by the previous run aren't loaded again.
+        restored_pages = dict(self.journal.restore_news_pages()) if self.journal is not None else dict()
+        start_time = time.perf_counter()
+        fetcher = self.__shared_fetcher if self.__shared_fetcher is not None else self.create_fetcher()
+        retry_queue = RetryQueue()
+        news_pages = deque()
+        duplicates_num = 0
+        yielded_num = 0
+        # The links aren't read further while the workers have enough pages to load, so the executor queue doesn't
+        # grow with a long list of links. The pages waiting for a retry don't count, the workers go on without them.
+        loading_pages = threading.BoundedSemaphore(self.workers_num * self.IN_FLIGHT_PAGES_NUM)
+        progress_bar = tqdm(total=links_num, disable=not self.show_progress)
+
+        def load_news_page(*arguments):
+            try:
+                self.__load_news_page(*arguments)
+            finally:
+                loading_pages.release()
+
+        def pop_news_page():
+            nonlocal yielded_num
+            news_page = news_pages.popleft().result()
+            if self.dedup_index is not None and self.journal is not None:
+                # The entity of the page goes to the dedup index right away, so the page must be in the journal
+                # before, otherwise the resumed parse would skip it as already collected
+                self.journal.flush()
+            if yielded_num == 0:
+                self.metrics.add_time("first_page", time.perf_counter() - start_time)
+            yielded_num += 1
+            progress_bar.update(1)
+            return news_page
+
+        try:
+            # Failed pages are retried by a separate lane after the backoff, the workers go on with the next pages
+            with ThreadPoolExecutor(max_workers=self.workers_num) as executor, \
+                    ThreadPoolExecutor(max_workers=self.RETRY_WORKERS_NUM) as retry_executor:
+                for _ in range(self.RETRY_WORKERS_NUM):
+                    retry_executor.submit(self.__run_retry_lane, retry_queue, fetcher)
+                try:
+                    for i, link in enumerate(links):
+                        news_page = Future()
+                        if i in restored_pages:
+                            news_page.set_result(restored_pages[i])
+                        elif self.dedup_index is not None and not self.dedup_index.claim(link):
+                            # News collected by the previous runs or by the other parsers aren't loaded
+                            duplicates_num += 1
+                            news_page.set_result(None)
+                        else:
+                            loading_pages.acquire()
+                            executor.submit(load_news_page, i, link, news_page, fetcher, retry_queue)
+                        news_pages.append(news_page)
+                        while news_pages and news_pages[0].done():
+                            yield pop_news_page()
+                    while news_pages:
+                        yield pop_news_page()
+                finally:
+                    for _, _, news_page, _ in retry_queue.close():
+                        news_page.set_result(None)
+        finally:
+            if duplicates_num:
+                print(f"[{type(self).__name__}] Skipped {duplicates_num} already collected news ...")
+                self.metrics.increment("duplicates", duplicates_num)
+            progress_bar.close()
+            if fetcher is not self.__shared_fetcher:
+                fetcher.close()
+            self.metrics.add_time("texts", time.perf_counter() - start_time)
+
+    def __run_retry_lane(self, retry_queue: RetryQueue, fetcher):
+        while (item := retry_queue.get()) is not None:
+            index, link, news_page, attempt = item
+            self.__load_news_page(index, link, news_page, fetcher, retry_queue, attempt)
+
+    def __load_news_page(self, index: int, link: str, news_page: Future, fetcher, retry_queue: RetryQueue,
+                         attempt: int = 1):
+        try:
+            self.__try_news_page(index, link, news_page, fetcher, retry_queue, attempt)
+        except Exception as e:
+            # Unexpected errors of the parser stop the parse as before
+            news_page.set_exception(e)
+
+    def __try_news_page(self, index: int, link: str, news_page: Future, fetcher, retry_queue: RetryQueue,
+                        attempt: int):
+        try:
+            page_data = self.__parse_news_page(link, fetcher)
+        except (WebDriverException, RequestException, PageFailure) as e:
+            failure_kind = classify_failure(e, self.BLOCK_STATUS_CODES)
+            self.metrics.increment(f"failures_{failure_kind}")
+            if failure_kind == FailureKind.BLOCKED:
+                self.metrics.increment("blocks")
+                host_rate_limiter.on_block(link, self.DOMAIN_REQUEST_INTERVAL)
+            delay = None
+            # The archived pages are the same on every read, so the failures of the replay are final
+            if failure_kind in TRANSIENT_FAILURES and self.replay_archive is None:
+                delay = retry_queue.put((index, link, news_page, attempt + 1), attempt)
+            if delay is not None:
+                print(f"[{type(self).__name__}][Warning] Page {link} failed ({failure_kind}), "
+                      f"retry in {delay:.1f} s ...")
+                self.metrics.increment("retries")
+                return
+            print(f"[{type(self).__name__}][Warning] Can't load page {link} ({failure_kind}): {e}")
+            self.metrics.increment("failures")
+            page_data = None
+        else:
+            host_rate_limiter.on_success(link, self.DOMAIN_REQUEST_INTERVAL)
+        if self.journal is not None:
+            self.journal.add_news_page(index, page_data)
+        news_page.set_result(page_data)
+
+    def __parse_news_page(self, link: str, fetcher) -> Tuple:
+        with fetcher.page(link) as page:
+            with self.metrics.timer("extract"):
+                page_data = self.parse_news_page(page)
+            # The first value is the news text, an empty one is usually a page rendered before its content
+            if not page_data or not (page_data[0] or "").strip():
+                raise PageFailure(FailureKind.EMPTY_BODY, f"Empty news text on {link}")
+        self.metrics.increment("pages")
+        return page_data
@@ -1,90 +1,76 @@
 import argparse
-import math
-import os
-import time
+from typing import Iterable, Iterator, List
 
-import dateparser
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import ElementClickInterceptedException, NoSuchElementException
-from tqdm import tqdm
 
-from global_data import CHROMEDRIVER_BIN
-from parsers.parser import Parser, ParseEntity, ParseResult
+from parsers.cli import (add_fetch_arguments, configure_parser, finish_parser, open_result_sink,
+                         save_parse_result)
+from parsers.dates import parse_news_date
+from parsers.discovery import Discovery
+from parsers.parser import FetchBackend, Parser, ParseEntity, ParseResult
 
 
 class IZParser(Parser):
-    NEWS_ON_PAGE_NUM = 16
-    SLEEP_TIME_SCROLL_BOTTOM = 2  # seconds
-    PAGES_NUM_BETWEEN_SLEEPS = 2
-    SLEEP_TIME_NEWS_PAGE = 5  # seconds
+    DISCOVERY_FEEDS = ["https://iz.ru/xml/rss/all.xml", ]
+    CARD_SELECTOR = ".node__cart__item"
+    CARD_FIELDS = {
+        "link": (".node__cart__item__inside", "href"),
+        "title": (".node__cart__item__inside__info__title", "innerText"),
+        "tag": (".node__cart__item__category_news", "innerText"),
+    }
+    BODY_SELECTOR = ".text-article__inside"
+    FETCH_BACKEND = FetchBackend.HTTP
 
     def __init__(self):
         super().__init__('https://iz.ru/news')
-        self.selenium_service = webdriver.ChromeService(executable_path=CHROMEDRIVER_BIN)
-
-    def parse(self, news_num: int) -> ParseResult:
-        selenium_driver = webdriver.Chrome(service=self.selenium_service)
-        selenium_driver.maximize_window()
-        selenium_driver.get(self.start_url)
-
-        # Moving to site bottom
-        scrolls_num = math.ceil(news_num / float(self.NEWS_ON_PAGE_NUM))
-        print(f"[IZParser] Clicking to get more news ...")
-        try:
-            for i in tqdm(range(scrolls_num)):
-                time.sleep(self.SLEEP_TIME_SCROLL_BOTTOM)
-                self.__move_to_bottom(selenium_driver)
-        except (ElementClickInterceptedException, NoSuchElementException):
-            print(f"[IZParser][Warning] Access to the button has been blocked ...")
-        self.__move_to_bottom(selenium_driver)
-
-        # Get news titles and metadata
-        print(f"[IZParser] Parse titles ...")
-        news_web_items = selenium_driver.find_elements(By.CLASS_NAME, "node__cart__item")[:news_num]
-        news_data = []
-        for item in tqdm(news_web_items):
-            news_link = item.find_element(By.CLASS_NAME, "node__cart__item__inside").get_attribute('href')
-            news_title = self.__get_news_title(item)
-            news_tag = item.find_element(By.CLASS_NAME, "node__cart__item__category_news").text
-            news_data.append([news_title, news_link, news_tag])
-
-        # Get news dates and texts
+
+    def iter_titles(self, news_num: int) -> Iterator[List]:
+        # The feeds too shallow for `news_num` news give way to the listing
+        feed_news = self.discover_news(news_num) if self.discovery == Discovery.FEED else None
+        if feed_news is not None:
+            for news in feed_news:
+                yield [news.title, news.link, news.tag]
+        else:
+            with self.listing_driver() as selenium_driver:
+                yield from self.__parse_titles(selenium_driver, news_num)
+
+    def parse_texts(self, news_data: Iterable[List]) -> ParseResult:
+        # Get news dates and texts, the entities are created as soon as their pages are loaded
         print(f"[IZParser] Parse texts ...")
-        for i, data in enumerate(tqdm(news_data)):
-            if (i % self.PAGES_NUM_BETWEEN_SLEEPS) == 0:
-                time.sleep(self.SLEEP_TIME_NEWS_PAGE)
-            news_link = data[1]
-            selenium_driver.get(news_link)
-            news_date = self.__get_news_date(selenium_driver)
-            news_text = self.__get_news_text(selenium_driver)
-            data.append(news_text)
-            data.append(news_date)
+        news_items = self.parse_news_rows(news_data, self.NEWS_LINK_INDEX)
 
         # Create ParseResult
-        parse_result = ParseResult()
-        for id, item in enumerate(tqdm(news_data)):
+        parse_result = self.create_parse_result()
+        for id, item in enumerate(news_items):
             entity = ParseEntity(id=id, date=item[4], link=item[1], tags=[item[2], ],
                                  title=item[0], text=item[3])
             parse_result.add_entity(entity)
 
         return parse_result
 
+    def __parse_titles(self, selenium_driver, news_num: int):
+        self.load_listing_page(selenium_driver, self.start_url)
+
+        # Get news titles and metadata, the new cards are read after every "More" scroll
+        print(f"[IZParser] Parse titles ...")
+        for card in self.harvest_cards(selenium_driver, news_num, self.__move_to_bottom):
+            if self.is_known_news(card["link"]):
+                break
+            yield [card["title"] or "", card["link"], card["tag"] or ""]
+
+    def parse_news_page(self, page):
+        news_text = self.__get_news_text(page)
+        with self.metrics.timer("dates"):
+            news_date = self.__get_news_date(page)
+        return news_text, news_date
+
     @staticmethod
     def __move_to_bottom(driver):
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
 
-    @staticmethod
-    def __get_news_title(driver):
-        news_title = driver.find_element(By.CLASS_NAME, "node__cart__item__inside__info__title").text
-        return news_title
-
     @staticmethod
     def __get_news_text(driver):
-        try:
-            news_body = driver.find_element(By.CLASS_NAME, "text-article__inside").text
-        except NoSuchElementException:
-            news_body = ''
+        news_body = driver.find_element(By.CLASS_NAME, "text-article__inside").text
         return news_body
 
     @staticmethod
@@ -92,7 +78,7 @@ class IZParser(Parser):
         dates_in_text = driver.find_elements(By.CLASS_NAME, "article_page__left__top__time__label")
         for date_in_text in dates_in_text:
             date_in_text = date_in_text.text
-            news_date = dateparser.parse(date_in_text)
+            news_date = parse_news_date(date_in_text, "iz")
             if news_date:
                 return news_date
         return None
@@ -103,16 +89,16 @@ if __name__ == '__main__':
     args_parser.add_argument("-n", "--news-num", required=True,
                              help="How many fresh news articles do you want to parse?")
     args_parser.add_argument("-o", "--output", required=True,
-                             help="Output filename. Please use .csv or .xlsx extension")
+                             help="Output filename with .csv, .jsonl, .parquet, .arrow or .xlsx extension, "
+                                  "or a directory for the Parquet dataset partitioned by source and day")
+    add_fetch_arguments(args_parser)
     args = args_parser.parse_args()
 
+    result_sink = open_result_sink(args.output, "iz")
     parser = IZParser()
+    configure_parser(parser, args)
+    parser.result_sink = result_sink
     parse_data = parser.parse(int(args.news_num))
+    finish_parser(parser, parse_data, args)
 
-    extension = os.path.splitext(args.output)[1]
-    if extension == '.csv':
-        parse_data.to_csv(args.output)
-    elif extension == '.xlsx':
-        parse_data.to_excel(args.output)
-    else:
-        raise ValueError("Incorrect output file extension! Please use .csv or .xlsx")
+    save_parse_result(parse_data, args.output, result_sink)
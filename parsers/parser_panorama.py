@@ -1,109 +1,198 @@
 import argparse
-import os
+import sys
 import time
 from enum import Enum
+from typing import Iterable, Iterator, List
+from urllib.parse import urljoin
 
 from datetime import datetime, timedelta
-from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
 from selenium.webdriver.common.by import By
 from tqdm import tqdm
 
-from global_data import CHROMEDRIVER_BIN
-from parsers.parser import Parser, ParseEntity, ParseResult
+from parsers.cli import add_fetch_arguments, open_result_sink, parse_date_argument, run_parsers, save_parse_result
+from parsers.discovery import discover_archive_news, DiscoveredNews, Discovery
+from parsers.parser import FetchBackend, HttpFetcher, Parser, ParseEntity, ParseResult
 
 
 class PanoramaCategories(str, Enum):
     POLITICS = "politics"
     SOCIETY = "society"
 
+    def __str__(self):
+        return self.value
 
-class PanoramaParser(Parser):
-
-    PAGES_NUM_BETWEEN_SLEEPS = 1
-    SLEEP_TIME_NEWS_PAGE = 5  # seconds
 
-    def __init__(self, category: PanoramaCategories = None, from_date: datetime = None):
-        self.current_date = datetime.today() if from_date is None else from_date
+class PanoramaParser(Parser):
+    SITE_URL = "https://panorama.pub"
+    FETCH_BACKEND = FetchBackend.HTTP
+    CARD_SELECTOR = ".flex.flex-col.rounded-md.mb-2"
+    CARD_FIELDS = {
+        "link": (None, "href"),
+        "text": (None, "innerText"),
+    }
+    BODY_SELECTOR = ".entry-contents.pr-0"
+
+    SHARD_DAYS = 30
+
+    def __init__(self, category: PanoramaCategories = None, from_date: datetime = None, to_date: datetime = None):
+        # The days are walked back from `to_date` (today by default) to `from_date` (no limit by default)
+        self.from_date = from_date
+        self.to_date = datetime.today() if to_date is None else to_date
+        self.current_date = self.to_date
         self.category = category
         super().__init__(self.get_current_news_page_link())
-        self.selenium_service = webdriver.ChromeService(executable_path=CHROMEDRIVER_BIN)
 
     def get_current_news_page_link(self):
-        return f"https://panorama.pub/{self.category}/{self.current_date.strftime('%d-%m-%Y')}"
+        return self.__get_news_page_link(self.current_date)
 
-    def parse(self, news_num: int) -> ParseResult:
-        selenium_driver = webdriver.Chrome(service=self.selenium_service)
-        selenium_driver.maximize_window()
-
-        print(f"[PanoramaParser] Parse titles ...")
-        news_data = []
-        current_url = self.start_url
-        progress_bar = tqdm(total=news_num)
-        while len(news_data) < news_num:
-            selenium_driver.get(current_url)
-            for news_block in selenium_driver.find_elements(By.CLASS_NAME, "flex.flex-col.rounded-md.mb-2"):
-                news_link = news_block.get_attribute('href')
-                news_title = news_block.text.split('\n')[-1]
-                news_data.append([news_title, news_link, self.current_date])
-                progress_bar.update(1)
-            self.current_date -= timedelta(1)
-            current_url = self.get_current_news_page_link()
-        news_data = news_data[:news_num]
+    def iter_titles(self, news_num: int) -> Iterator[List]:
+        if self.discovery == Discovery.FEED:
+            yield from self.__discover_titles(news_num)
+        else:
+            with self.listing_driver() as selenium_driver:
+                yield from self.__parse_titles(selenium_driver, news_num)
 
-        # Get news dates and texts
+    def parse_texts(self, news_data: Iterable[List]) -> ParseResult:
+        # Get news dates and texts, the entities are created as soon as their pages are loaded
         print(f"[PanoramaParser] Parse texts ...")
-        for i, data in enumerate(tqdm(news_data)):
-            if (i % self.PAGES_NUM_BETWEEN_SLEEPS) == 0:
-                time.sleep(self.SLEEP_TIME_NEWS_PAGE)
-            news_link = data[1]
-            news_text = self.__get_news_text(news_link, selenium_driver)
-            data.append(news_text)
+        news_items = self.parse_news_rows(news_data, self.NEWS_LINK_INDEX)
 
         # Create ParseResult
-        parse_result = ParseResult()
-        for id, item in enumerate(tqdm(news_data)):
+        parse_result = self.create_parse_result()
+        for id, item in enumerate(news_items):
             entity = ParseEntity(id=id, date=item[2], link=item[1],
                                  title=item[0], text=item[3], tags=[f"{self.category}", ])
             parse_result.add_entity(entity)
 
         return parse_result
 
-    @staticmethod
-    def __get_news_text(link, driver):
+    def __parse_titles(self, selenium_driver, news_num: int):
+        print(f"[PanoramaParser] Parse titles ...")
+        news_count = 0
+        current_url = self.start_url
+        progress_bar = tqdm(total=news_num)
+        while news_count < news_num and not self.__is_crawled_date(self.current_date):
+            self.load_listing_page(selenium_driver, current_url)
+            for card in self.extract_cards(selenium_driver):
+                if news_count >= news_num:
+                    break
+                if self.is_known_news(card["link"]):
+                    continue
+                # The title is the last line of the card text
+                news_title = (card["text"] or "").split('\n')[-1]
+                yield [news_title, card["link"], self.current_date]
+                news_count += 1
+                progress_bar.update(1)
+            self.current_date -= timedelta(1)
+            current_url = self.get_current_news_page_link()
+
+    def __discover_titles(self, news_num: int):
+        # The day pages don't depend on each other, so the archive is walked back by `workers_num` days at once
+        print(f"[PanoramaParser] Discover titles in the date archive ...")
+        fetcher = HttpFetcher(self.DOMAIN_REQUEST_INTERVAL, self.DOMAIN_REQUEST_BURST, self.metrics)
+        news_count = 0
+        progress_bar = tqdm(total=news_num)
+        start_time = time.perf_counter()
         try:
-            driver.get(link)
-            return driver.find_element(By.CLASS_NAME, "entry-contents.pr-0").text
-        except NoSuchElementException:
-            print(f"[PanoramaParser][WARNING] Can't find text {link}")
-            return ""
+            while news_count < news_num and not self.__is_crawled_date(self.current_date):
+                days = [self.current_date - timedelta(i) for i in range(self.workers_num)]
+                days = [day for day in days if not self.__is_crawled_date(day)]
+                for day, day_news in discover_archive_news(fetcher, self.__get_news_page_link, self.__parse_archive,
+                                                           days, self.workers_num):
+                    for news in day_news:
+                        if news_count >= news_num:
+                            return
+                        if self.is_known_news(news.link):
+                            continue
+                        yield [news.title, news.link, day]
+                        news_count += 1
+                        progress_bar.update(1)
+                self.current_date -= timedelta(len(days))
+        finally:
+            fetcher.close()
+            self.metrics.add_time("titles", time.perf_counter() - start_time)
+
+    def __get_news_page_link(self, date: datetime) -> str:
+        return f"{self.SITE_URL}/{self.category}/{date.strftime('%d-%m-%Y')}"
+
+    def __parse_archive(self, page) -> List[DiscoveredNews]:
+        news = []
+        for card in page.find_elements(By.CSS_SELECTOR, self.CARD_SELECTOR):
+            # The title is the last line of the card text
+            news.append(DiscoveredNews(link=urljoin(page.current_url, card.get_attribute('href')),
+                                       title=card.text.split('\n')[-1]))
+        return news
+
+    @property
+    def state_key(self) -> str:
+        if self.from_date is None:
+            return f"{super().state_key}:{self.category}"
+        return f"{super().state_key}:{self.category}:{self.from_date:%Y-%m-%d}:{self.to_date:%Y-%m-%d}"
+
+    def __is_crawled_date(self, date: datetime) -> bool:
+        # The day of the last parsed news is walked again, it can have news published after the last run
+        if self.from_date is not None and date.date() < self.from_date.date():
+            return True
+        return self.last_news_date is not None and date.date() < self.last_news_date.date()
+
+    def parse_news_page(self, page):
+        return self.__get_news_text(page),
+
+    @staticmethod
+    def __get_news_text(driver):
+        return driver.find_element(By.CLASS_NAME, "entry-contents.pr-0").text
+
+
+def create_shards(categories: List[PanoramaCategories], from_date: datetime, to_date: datetime = None,
+                  shard_days: int = PanoramaParser.SHARD_DAYS) -> List[PanoramaParser]:
+    # Every category is split into date ranges of `shard_days` days, the shards go by category and newest first
+    to_date = datetime.today() if to_date is None else to_date
+    shards = []
+    for category in categories:
+        shard_to_date = to_date
+        while shard_to_date.date() >= from_date.date():
+            shard_from_date = max(from_date, shard_to_date - timedelta(shard_days - 1))
+            shards.append(PanoramaParser(category=category, from_date=shard_from_date, to_date=shard_to_date))
+            shard_to_date = shard_from_date - timedelta(1)
+    return shards
 
 
 if __name__ == '__main__':
     args_parser = argparse.ArgumentParser(description="Parser to get fresh news articles from panorama.pub")
-    args_parser.add_argument("-n", "--news-num", required=True, type=int,
-                             help="How many fresh news articles do you want to parse?")
+    args_parser.add_argument("-n", "--news-num", type=int,
+                             help="How many fresh news articles do you want to parse? With --from-date it is "
+                                  "the limit of every shard, all news of the window are parsed by default")
     args_parser.add_argument("-o", "--output", required=True,
-                             help="Output filename. Please use .csv or .xlsx extension")
+                             help="Output filename with .csv, .jsonl, .parquet, .arrow or .xlsx extension, "
+                                  "or a directory for the Parquet dataset partitioned by source and day")
+    args_parser.add_argument("--from-date", type=parse_date_argument,
+                             help="First day of the window YYYY-MM-DD, the window is split into parallel shards")
+    args_parser.add_argument("--to-date", type=parse_date_argument,
+                             help="Last day of the window YYYY-MM-DD (default: today)")
+    args_parser.add_argument("--shard-days", type=int, default=PanoramaParser.SHARD_DAYS,
+                             help=f"Days in one shard of the window (default: {PanoramaParser.SHARD_DAYS})")
+    args_parser.add_argument("-j", "--jobs", type=int, default=4,
+                             help="How many categories or shards are parsed at the same time")
+    add_fetch_arguments(args_parser)
     args = args_parser.parse_args()
+    if args.news_num is None and args.from_date is None:
+        args_parser.error("the following arguments are required: -n/--news-num or --from-date")
 
-    news_num = args.news_num
+    result_sink = open_result_sink(args.output, "panorama")
     categories = [PanoramaCategories.POLITICS, PanoramaCategories.SOCIETY, ]
-    news_step = news_num // len(categories)
-    parse_data_list = []
-    for i, category in enumerate(categories):
-        print(f'Parsing category: {category}')
-        parser = PanoramaParser(category=category)
-        parse_data = parser.parse(news_step if i < len(categories) - 1 else news_num)
-        parse_data_list.append(parse_data)
-        news_num -= news_step
-    for parse_data in parse_data_list[1:]:
-        parse_data_list[0] += parse_data
-    parse_data = parse_data_list[0]
-    extension = os.path.splitext(args.output)[1]
-    if extension == '.csv':
-        parse_data.to_csv(args.output)
-    elif extension == '.xlsx':
-        parse_data.to_excel(args.output)
+    if args.from_date is not None:
+        news_num = sys.maxsize if args.news_num is None else args.news_num
+        parsers = [(shard, news_num) for shard in create_shards(categories, args.from_date, args.to_date,
+                                                                  args.shard_days)]
     else:
-        raise ValueError("Incorrect output file extension! Please use .csv or .xlsx")
+        news_num = args.news_num
+        news_step = news_num // len(categories)
+        parsers = []
+        for i, category in enumerate(categories):
+            category_news_num = news_step if i < len(categories) - 1 else news_num - news_step * i
+            parsers.append((PanoramaParser(category=category, to_date=args.to_date), category_news_num))
+    print(f"[PanoramaParser] Parse {len(parsers)} shards ...")
+    parse_data = run_parsers(parsers, args, args.jobs)
+    if result_sink is not None:
+        parse_data.stream_to(result_sink)
+    save_parse_result(parse_data, args.output, result_sink)
@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from tqdm import tqdm
+
+from parsers.cli import open_page_archive, open_result_sink, save_parse_result
+from parsers.crawler import create_parsers
+from parsers.parser import ParseEntity, ParseResult
+
+
+CHUNK_NEWS_NUM = 500  # archived news extracted by one task of the process pool
+
+
+def get_parser_keys(parser_key: str, archived_keys: List[str]) -> List[str]:
+    # Archived parsers of the same extraction, e.g. the date ranges of a Panorama category
+    return [key for key in archived_keys if key == parser_key or key.startswith(parser_key + ':')]
+
+
+def reextract_news(archive_path: str, source: str, parser_index: int,
+                   news_data: List[List]) -> Tuple[List[ParseEntity], Dict[str, float]]:
+    # Runs in a worker process: the pages are read from the archive and parsed by the parser of the source as
+    # if they were loaded from the site. Extraction is CPU bound, so one thread per process is enough.
+    parser, _ = create_parsers(source, 0)[parser_index]
+    parser.replay_archive = open_page_archive(archive_path)
+    parser.workers_num = 1
+    parser.show_progress = False
+    parse_data = parser.parse_texts(news_data)
+    return list(parse_data.iter_entities()), parser.metrics.to_dict()["counters"]
+
+
+def reextract_source(executor: ProcessPoolExecutor, archive_path: str, source: str, output: str) -> ParseResult:
+    page_archive = open_page_archive(archive_path)
+    archived_keys = page_archive.get_parsers()
+    result_sink = open_result_sink(output, source)
+    parse_data = ParseResult(result_sink)
+    counters = dict()
+    for parser_index, (parser, _) in enumerate(create_parsers(source, 0)):
+        news_data = list(page_archive.iter_news_data(get_parser_keys(parser.state_key, archived_keys)))
+        print(f"[Reextract] {parser.state_key}: {len(news_data)} archived news ...")
+        chunks = [news_data[i:i + CHUNK_NEWS_NUM] for i in range(0, len(news_data), CHUNK_NEWS_NUM)]
+        results = executor.map(reextract_news, [archive_path] * len(chunks), [source] * len(chunks),
+                               [parser_index] * len(chunks), chunks)
+        # The chunks are merged in the order of the archive, whichever of them is extracted first
+        for entities, chunk_counters in tqdm(results, total=len(chunks)):
+            for entity in entities:
+                entity.id = len(parse_data)
+                parse_data.add_entity(entity)
+            for name, value in chunk_counters.items():
+                counters[name] = counters.get(name, 0) + value
+    save_parse_result(parse_data, output, result_sink)
+    failures = ', '.join(f"{name[len('failures_'):]}: {value:.0f}" for name, value in counters.items()
+                         if name.startswith("failures_"))
+    print(f"[Reextract] {source}: {len(parse_data)} news, {counters.get('failures', 0):.0f} pages failed"
+          + (f" ({failures})" if failures else ""))
+    return parse_data
+
+
+def reextract(archive_path: str, sources: List[str], output: str, output_format: str,
+              processes: Optional[int] = None) -> Dict[str, int]:
+    os.makedirs(output, exist_ok=True)
+    news_nums = dict()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for source in sources:
+            # All sources of the partitioned dataset are written to the same directory
+            source_output = output if output_format == "dataset" else \
+                os.path.join(output, f"{source}.{output_format}")
+            news_nums[source] = len(reextract_source(executor, archive_path, source, source_output))
+    return news_nums
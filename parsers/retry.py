@@ -0,0 +1,95 @@
+import heapq
+import itertools
+import threading
+import time
+from enum import Enum
+from typing import Any, List, Optional
+
+from selenium.common.exceptions import NoSuchElementException
+
+
+class FailureKind(str, Enum):
+    TIMEOUT = "timeout"  # timeouts, dropped connections, 5xx answers and crashed browsers
+    BLOCKED = "blocked"  # the site refuses to serve the crawler
+    LAYOUT_CHANGED = "layout_changed"  # the page has no elements the parser looks for
+    EMPTY_BODY = "empty_body"  # the page is loaded, but the news text is empty
+    HTTP_ERROR = "http_error"  # 404 and the other client errors
+
+    def __str__(self):
+        return self.value
+
+
+# Failures that can go away by themselves, the others are the same on every load of the page
+TRANSIENT_FAILURES = {FailureKind.TIMEOUT, FailureKind.BLOCKED, FailureKind.EMPTY_BODY, }
+
+
+class PageFailure(Exception):
+    def __init__(self, kind: FailureKind, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+def classify_failure(e: Exception, block_status_codes) -> FailureKind:
+    if isinstance(e, PageFailure):
+        return e.kind
+    if isinstance(e, NoSuchElementException):
+        return FailureKind.LAYOUT_CHANGED
+    status_code = getattr(getattr(e, "response", None), "status_code", None)
+    if status_code in block_status_codes:
+        return FailureKind.BLOCKED
+    if status_code is not None and status_code < 500:
+        return FailureKind.HTTP_ERROR
+    return FailureKind.TIMEOUT
+
+
+# Failed pages waiting for their next load. The delay grows exponentially with the attempts of the page,
+# the pages are taken by the retry lane in the order of their due time.
+class RetryQueue:
+
+    BACKOFF_DELAY = 2  # seconds before the first retry
+    BACKOFF_FACTOR = 2
+    MAX_DELAY = 60  # seconds
+    ATTEMPTS_NUM = 3  # loads of one page, the first one included
+
+    def __init__(self):
+        self.__condition = threading.Condition()
+        self.__items = []
+        self.__counter = itertools.count()
+        self.__closed = False
+
+    def get_delay(self, attempt: int) -> float:
+        return min(self.MAX_DELAY, self.BACKOFF_DELAY * self.BACKOFF_FACTOR ** (attempt - 1))
+
+    def put(self, item: Any, attempt: int) -> Optional[float]:
+        # Schedules the retry after the failed `attempt` and returns its delay.
+        # None if the page has no attempts left or the queue is closed.
+        if attempt >= self.ATTEMPTS_NUM:
+            return None
+        delay = self.get_delay(attempt)
+        with self.__condition:
+            if self.__closed:
+                return None
+            heapq.heappush(self.__items, (time.monotonic() + delay, next(self.__counter), item))
+            self.__condition.notify()
+        return delay
+
+    def get(self) -> Optional[Any]:
+        # Blocks until the earliest retry is due, None after the queue is closed
+        with self.__condition:
+            while not self.__closed:
+                timeout = None
+                if self.__items:
+                    timeout = self.__items[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        return heapq.heappop(self.__items)[2]
+                self.__condition.wait(timeout)
+            return None
+
+    def close(self) -> List[Any]:
+        # Stops the retry lane and returns the items which haven't been retried
+        with self.__condition:
+            self.__closed = True
+            items = [item for _, _, item in sorted(self.__items)]
+            self.__items = []
+            self.__condition.notify_all()
+        return items
@@ -0,0 +1,164 @@
+import csv
+import json
+import os
+import shutil
+import uuid
+from typing import List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from parsers.dataset import entities_to_table, publish_dataset, SCHEMA, write_dataset
+
+
+# Writes the entities to a file in batches while they are parsed, so the memory use doesn't depend on
+# the number of news. `entities_num` counts all written entities, including the ones still in the batch.
+class EntitySink:
+
+    BATCH_SIZE = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entities_num = 0
+        self.__batch: List = []
+
+    def write(self, entity):
+        self.__batch.append(entity)
+        self.entities_num += 1
+        if len(self.__batch) >= self.BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.__batch:
+            self.write_batch(self.__batch)
+            self.__batch = []
+
+    def write_batch(self, entities: List):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+# Same layout as the CSV files written by ParseResult so far
+class CsvSink(EntitySink):
+    def __init__(self, path: str, ru_date_format: bool = True, sep: str = ';'):
+        super().__init__(path)
+        self.ru_date_format = ru_date_format
+        self.sep = sep
+        self.__file = open(path, "w", encoding="utf-8", newline="")
+        self.__writer = None
+
+    def write_batch(self, entities: List):
+        rows = [entity.to_dict(self.ru_date_format, stop_symbols=[self.sep, ]) for entity in entities]
+        if self.__writer is None:
+            self.__writer = csv.DictWriter(self.__file, fieldnames=list(rows[0].keys()), delimiter=self.sep,
+                                           lineterminator=os.linesep)
+            self.__writer.writeheader()
+        self.__writer.writerows(rows)
+        self.__file.flush()
+
+    def close(self):
+        super().close()
+        self.__file.close()
+
+
+class JsonlSink(EntitySink):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.__file = open(path, "w", encoding="utf-8")
+
+    def write_batch(self, entities: List):
+        lines = []
+        for entity in entities:
+            row = entity.to_dict(list_sep=None)
+            row['date'] = entity.date.isoformat() if entity.date is not None else None
+            lines.append(json.dumps(row, ensure_ascii=False) + "\n")
+        self.__file.writelines(lines)
+        self.__file.flush()
+
+    def close(self):
+        super().close()
+        self.__file.close()
+
+
+# Every batch becomes a row group of the Parquet file
+class ParquetSink(EntitySink):
+    def __init__(self, path: str, compression: str = "zstd"):
+        super().__init__(path)
+        self.__writer = pq.ParquetWriter(path, SCHEMA, compression=compression)
+
+    def write_batch(self, entities: List):
+        self.__writer.write_table(entities_to_table(entities))
+
+    def close(self):
+        super().close()
+        self.__writer.close()
+
+
+# Arrow IPC file, can be memory-mapped and read without copying
+class ArrowSink(EntitySink):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.__file = pa.OSFile(path, "wb")
+        self.__writer = pa.ipc.new_file(self.__file, SCHEMA)
+
+    def write_batch(self, entities: List):
+        self.__writer.write_table(entities_to_table(entities))
+
+    def close(self):
+        super().close()
+        self.__writer.close()
+        self.__file.close()
+
+
+# Parquet dataset directory partitioned by source and day, see parsers.dataset.load_dataset.
+# The batches go to a hidden staging directory, which the dataset readers skip, and are moved into the dataset
+# when the sink is closed. So the parts of a crashed run are never published, and the resumed run writes all
+# its entities again. The staging directory of a named sink (the source of the crawl) is left by a crashed run
+# of the same name only and is removed by the next one.
+class DatasetSink(EntitySink):
+
+    BATCH_SIZE = 5000
+
+    def __init__(self, path: str, compression: str = "zstd", name: Optional[str] = None):
+        super().__init__(path)
+        self.compression = compression
+        self.staging_path = os.path.join(path, f".staging-{name if name is not None else uuid.uuid4().hex}")
+        if os.path.exists(self.staging_path):
+            shutil.rmtree(self.staging_path)
+
+    def write_batch(self, entities: List):
+        write_dataset(entities_to_table(entities), self.staging_path, self.compression)
+
+    def close(self):
+        super().close()
+        if os.path.exists(self.staging_path):
+            publish_dataset(self.staging_path, self.path)
+
+
+SINKS = {
+    ".csv": CsvSink,
+    ".jsonl": JsonlSink,
+    ".parquet": ParquetSink,
+    ".arrow": ArrowSink,
+    ".feather": ArrowSink,
+    "": DatasetSink,
+}
+
+
+def open_sink(path: str, name: Optional[str] = None) -> EntitySink:
+    # A path without extension is a directory of the partitioned Parquet dataset, `name` of its writer
+    extension = os.path.splitext(path.rstrip("/\\"))[1]
+    if extension not in SINKS:
+        raise ValueError(f"Can't stream to {extension} file! Please use one of: "
+                         f"{', '.join(filter(None, SINKS))} or a directory")
+    if SINKS[extension] is DatasetSink:
+        return DatasetSink(path, name=name)
+    return SINKS[extension](path)
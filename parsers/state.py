@@ -0,0 +1,69 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Set
+
+from parsers.parser import Parser, ParseResult
+from parsers.urls import normalize_url
+
+
+# High-water marks of the incremental crawl: the freshest links and the latest news date of every source,
+# the next run of the source stops as soon as it reaches them
+class CrawlState:
+
+    LINKS_NUM = 100
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__state: Dict[str, Dict] = self.__load()
+        self.__updated_keys: Set[str] = set()
+
+    def restore(self, parser: Parser):
+        source_state = self.__state.get(parser.state_key)
+        if source_state is None:
+            return
+        parser.known_links = set(source_state["links"])
+        parser.last_news_date = datetime.fromisoformat(source_state["date"]) if source_state["date"] else None
+
+    def update(self, parser: Parser, parse_data: ParseResult):
+        with self.__lock:
+            self.__update(parser, parse_data)
+
+    def save(self):
+        with self.__lock:
+            self.__save()
+
+    def __update(self, parser: Parser, parse_data: ParseResult):
+        source_state = self.__state.get(parser.state_key, {"links": [], "date": None})
+        # Entities go from the freshest news to the oldest ones
+        links = [normalize_url(link) for link in parse_data.head_links]
+        links += [link for link in source_state["links"] if link not in set(links)]
+        dates = [parse_data.max_date, ] if parse_data.max_date is not None else []
+        if source_state["date"]:
+            dates.append(datetime.fromisoformat(source_state["date"]))
+        self.__state[parser.state_key] = {
+            "links": links[:self.LINKS_NUM],
+            "date": max(dates).isoformat() if dates else None,
+        }
+        self.__updated_keys.add(parser.state_key)
+
+    def __load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return dict()
+        with open(self.path, encoding="utf-8") as state_file:
+            return json.load(state_file)
+
+    def __save(self):
+        # Sources crawled by other processes save the same file, so only the sources updated here are written
+        # over the state on disk
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        state = self.__load()
+        state.update((key, self.__state[key]) for key in self.__updated_keys)
+        self.__state.update(state)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as state_file:
+            json.dump(state, state_file, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,21 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+TRACKING_QUERY_PARAMS = {"fbclid", "from", "gclid", "utm_campaign", "utm_content", "utm_medium", "utm_source",
+                         "utm_term", "yclid"}
+
+
+def normalize_url(url: str) -> str:
+    # Same article - same key: lowercase scheme and host, no "www.", default port, fragment, tracking
+    # parameters and trailing slash, sorted query
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[len("www."):]
+    if parts.port is not None and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip('/') or '/'
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if key.lower() not in TRACKING_QUERY_PARAMS)
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
@@ -0,0 +1,89 @@
+import argparse
+import os
+import socket
+import time
+from typing import Dict, Optional
+
+from parsers.cli import configure_parser, open_result_sink, save_parse_result, save_parser_metrics
+from parsers.crawler import create_parsers
+from parsers.frontier import Frontier, LEASED, PENDING
+from parsers.parser import ParseEntity, Parser, ParseResult
+from parsers.urls import normalize_url
+
+
+BATCH_SIZE = 50  # news claimed by a worker at once, loaded well within the lease timeout
+POLL_INTERVAL = 10  # seconds between the claims while the other workers hold the last news
+
+
+def get_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def configure_frontier_parser(parser: Parser, args: argparse.Namespace):
+    # The frontier keeps the progress of the crawl instead of the journal, the checkpoints of the usual crawls
+    # of the same parsers aren't touched
+    configure_parser(parser, args, journal=False)
+
+
+def seed_frontier(frontier: Frontier, source: str, news_num: int, args: argparse.Namespace) -> int:
+    # The titles phase of the source on this host, its news are loaded by the workers
+    added_num = 0
+    for parser, parser_news_num in create_parsers(source, news_num):
+        configure_frontier_parser(parser, args)
+        news_data = parser.parse_titles(parser_news_num)
+        parser_added_num = frontier.add_news(parser.state_key, news_data, parser.NEWS_LINK_INDEX)
+        print(f"[Frontier] {parser.state_key}: {parser_added_num} of {len(news_data)} news added")
+        save_parser_metrics(parser, args)
+        added_num += parser_added_num
+    return added_num
+
+
+def work_batch(parser: Parser, frontier: Frontier, worker: str, batch_size: int) -> Optional[int]:
+    # Loads one claimed batch, None if there is nothing to claim now
+    lease = frontier.claim(parser.state_key, worker, batch_size)
+    if lease is None:
+        return None
+    item_ids = {normalize_url(row[parser.NEWS_LINK_INDEX]): item_id for item_id, row in lease.items}
+    entities: Dict[int, Optional[ParseEntity]] = {item_id: None for item_id, _ in lease.items}
+    for entity in parser.parse_texts([row for _, row in lease.items]).iter_entities():
+        entities[item_ids[normalize_url(entity.link)]] = entity
+    committed_num = frontier.commit(lease.id, entities)
+    if committed_num < len(lease.items):
+        print(f"[Frontier][Warning] Lease {lease.id} expired, {len(lease.items) - committed_num} news are "
+              f"committed by another worker")
+    return committed_num
+
+
+def run_worker(frontier: Frontier, source: str, args: argparse.Namespace, batch_size: int = BATCH_SIZE) -> int:
+    # Claims the batches of the source until all its news are done. The parsers load the pages as in the usual
+    # crawl, the entities are committed to the frontier instead of the sink.
+    worker = get_worker_name()
+    committed_num = 0
+    for parser, _ in create_parsers(source, 0):
+        configure_frontier_parser(parser, args)
+        parser.show_progress = False
+        # One fetcher loads all batches of the parser, the browsers aren't started again for every lease
+        with parser.shared_fetcher():
+            while True:
+                batch_committed_num = work_batch(parser, frontier, worker, batch_size)
+                if batch_committed_num is not None:
+                    committed_num += batch_committed_num
+                    continue
+                progress = frontier.get_progress(parser.state_key)
+                if not progress.get(PENDING) and not progress.get(LEASED):
+                    break
+                # The leases of the other workers can still expire
+                time.sleep(POLL_INTERVAL)
+        save_parser_metrics(parser, args)
+    return committed_num
+
+
+def export_frontier(frontier: Frontier, source: str, output: str) -> ParseResult:
+    result_sink = open_result_sink(output, source)
+    parse_data = ParseResult(result_sink)
+    for parser, _ in create_parsers(source, 0):
+        for entity in frontier.iter_entities(parser.state_key):
+            entity.id = len(parse_data)
+            parse_data.add_entity(entity)
+    save_parse_result(parse_data, output, result_sink)
+    return parse_data
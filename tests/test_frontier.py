@@ -0,0 +1,112 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+import requests
+
+from parsers.frontier import DONE, FAILED, FrontierServer, HttpFrontier, LEASED, PENDING, SqliteFrontier
+from parsers.parser import ParseEntity
+
+
+LEASE_TIMEOUT = 0.5  # seconds
+TOKEN = "secret"
+
+
+# The SQLite frontier behind the HTTP server, used by the workers of the other hosts through the client
+@pytest.fixture
+def server(tmp_path):
+    frontier = SqliteFrontier(str(tmp_path / "frontier.sqlite"), LEASE_TIMEOUT)
+    frontier_server = FrontierServer(frontier, token=TOKEN)
+    thread = threading.Thread(target=frontier_server.serve_forever, daemon=True)
+    thread.start()
+    yield frontier_server
+    frontier_server.shutdown()
+    frontier_server.server_close()
+    thread.join()
+    frontier.close()
+
+
+@pytest.fixture
+def frontier(server):
+    client = HttpFrontier(server.url, TOKEN)
+    yield client
+    client.close()
+
+
+def create_rows(news_num: int, start: int = 0):
+    return [[datetime(2024, 5, 1, 12, i), f"https://kp.ru/daily/{i}/", f"Title {i}"]
+            for i in range(start, start + news_num)]
+
+
+def create_entity(row) -> ParseEntity:
+    return ParseEntity(id=0, date=row[0], link=row[1], title=row[2], text=f"Text of {row[2]}", tags=["politics"])
+
+
+def test_add_news_skips_known_news(frontier):
+    assert frontier.add_news("kp", create_rows(3), 1) == 3
+    # The same news with another form of the link and a new one
+    rows = [[datetime(2024, 5, 1, 12, 0), "https://www.kp.ru/daily/0?utm_source=rss", "Title 0"]] + create_rows(1, 3)
+    assert frontier.add_news("kp", rows, 1) == 1
+    # The news of the other parsers are separate
+    assert frontier.add_news("ria", create_rows(2), 1) == 2
+    assert frontier.get_progress("kp") == {PENDING: 4}
+
+
+def test_claim_and_commit(frontier):
+    frontier.add_news("kp", create_rows(3), 1)
+    lease = frontier.claim("kp", "worker-1", 2)
+    assert [row[1] for _, row in lease.items] == ["https://kp.ru/daily/0/", "https://kp.ru/daily/1/"]
+    assert lease.items[0][1][0] == datetime(2024, 5, 1, 12, 0)
+    assert frontier.get_progress("kp") == {LEASED: 2, PENDING: 1}
+
+    (first_id, first_row), (second_id, _) = lease.items
+    assert frontier.commit(lease.id, {first_id: create_entity(first_row), second_id: None}) == 2
+    assert frontier.get_progress("kp") == {DONE: 1, FAILED: 1, PENDING: 1}
+
+    lease = frontier.claim("kp", "worker-1", 2)
+    assert [row[1] for _, row in lease.items] == ["https://kp.ru/daily/2/"]
+    assert frontier.commit(lease.id, {item_id: create_entity(row) for item_id, row in lease.items}) == 1
+    assert frontier.claim("kp", "worker-1", 2) is None
+
+
+def test_expired_lease_is_claimed_again(frontier):
+    frontier.add_news("kp", create_rows(2), 1)
+    stale_lease = frontier.claim("kp", "worker-1", 2)
+    assert frontier.claim("kp", "worker-2", 2) is None
+
+    time.sleep(LEASE_TIMEOUT * 2)
+    lease = frontier.claim("kp", "worker-2", 2)
+    assert [item_id for item_id, _ in lease.items] == [item_id for item_id, _ in stale_lease.items]
+
+    # The first worker comes back after its lease expired, only the entities of the new lease are kept
+    assert frontier.commit(stale_lease.id, {item_id: create_entity(row) for item_id, row in stale_lease.items}) == 0
+    assert frontier.commit(lease.id, {item_id: create_entity(row) for item_id, row in lease.items}) == 2
+    assert frontier.get_progress("kp") == {DONE: 2}
+    assert len(list(frontier.iter_entities("kp"))) == 2
+
+
+def test_iter_entities_in_order_of_news(frontier):
+    frontier.PAGE_SIZE = 2
+    frontier.add_news("kp", create_rows(5), 1)
+    leases = [frontier.claim("kp", f"worker-{i}", 2) for i in range(3)]
+    # The batches are committed in any order, the failed news have no entity
+    for lease in reversed(leases):
+        entities = {item_id: create_entity(row) for item_id, row in lease.items}
+        if lease is leases[1]:
+            entities[lease.items[0][0]] = None
+        frontier.commit(lease.id, entities)
+
+    entities = list(frontier.iter_entities("kp"))
+    assert [entity.link for entity in entities] == [
+        "https://kp.ru/daily/0/", "https://kp.ru/daily/1/", "https://kp.ru/daily/3/", "https://kp.ru/daily/4/"]
+    assert entities[0].date == datetime(2024, 5, 1, 12, 0)
+    assert entities[0].tags == ["politics"]
+
+
+def test_requests_without_token_are_refused(server):
+    client = HttpFrontier(server.url)
+    with pytest.raises(requests.HTTPError) as error:
+        client.get_progress("kp")
+    assert error.value.response.status_code == 403
+    client.close()
@@ -0,0 +1,93 @@
+import pytest
+import requests
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from benchmarks.fixture_server import FixtureServer
+from benchmarks.fixtures import get_news_date, get_paragraphs, get_title
+from parsers.crawler import create_parsers
+from parsers.parser import FetchBackend, HtmlPage, HttpFetcher, Parser
+from parsers.retry import classify_failure, FailureKind
+
+
+NEWS_NUM = 20
+HTTP_SOURCES = [source for source in ["meduza", "tvrain", "panorama", "rt", "iz", "kp", ]
+                if create_parsers(source, 0)[0][0].FETCH_BACKEND == FetchBackend.HTTP]
+
+
+@pytest.fixture(scope="module")
+def server():
+    with FixtureServer(NEWS_NUM) as fixture_server:
+        yield fixture_server
+
+
+@pytest.fixture
+def fetcher():
+    http_fetcher = HttpFetcher(0)
+    yield http_fetcher
+    http_fetcher.close()
+
+
+def test_page_of_fixture_server(server, fetcher):
+    link = f"{server.base_url}/rt/news/3"
+    with fetcher.page(link) as page:
+        assert page.current_url == link
+        assert "<h1>" in page.page_source
+        assert page.find_element(By.TAG_NAME, "h1").text == get_title(3)
+        paragraphs = page.find_elements(By.CSS_SELECTOR, ".article__text p")
+        assert [paragraph.text for paragraph in paragraphs] == get_paragraphs(3)
+    assert fetcher.metrics.to_dict()["counters"]["bytes"] > 0
+
+
+@pytest.mark.parametrize("source", HTTP_SOURCES)
+def test_news_page_of_http_source(server, fetcher, source):
+    parser, _ = create_parsers(source, 0)[0]
+    with fetcher.page(f"{server.base_url}/{source}/news/5") as page:
+        page_data = parser.parse_news_page(page)
+    # TV Rain puts the lead before the paragraphs
+    assert page_data[0].split('\n')[-len(get_paragraphs(5)):] == get_paragraphs(5)
+    if len(page_data) > 1:
+        assert page_data[1] == get_news_date(5)
+
+
+@pytest.mark.parametrize("status_code, failure_kind", [
+    (403, FailureKind.BLOCKED),
+    (429, FailureKind.BLOCKED),
+    (404, FailureKind.HTTP_ERROR),
+    (410, FailureKind.HTTP_ERROR),
+    (500, FailureKind.TIMEOUT),
+    (503, FailureKind.TIMEOUT),
+])
+def test_status_code_failure(server, fetcher, status_code, failure_kind):
+    with pytest.raises(requests.HTTPError) as error:
+        with fetcher.page(f"{server.base_url}/status/{status_code}"):
+            pass
+    assert error.value.response.status_code == status_code
+    assert classify_failure(error.value, Parser.BLOCK_STATUS_CODES) == failure_kind
+
+
+def test_element_text_keeps_blocks_and_skips_scripts():
+    page = HtmlPage('<div class="article"><h1>Title</h1><p>First   <b>bold</b>\n text</p><script>var x;</script>'
+                    '<!-- ad slot --><ul><li>One</li><li>Two</li></ul><span>inline</span> <span>spans</span></div>')
+    assert page.find_element(By.CLASS_NAME, "article").text == "Title\nFirst bold text\nOne\nTwo\ninline spans"
+
+
+def test_element_lookup():
+    page = HtmlPage('<div id="news" class="card big"><a href="/news/1">One</a><a href="/news/2">Two</a></div>')
+    card = page.find_element(By.ID, "news")
+    assert card.get_attribute("class") == "card big"
+    assert card.get_attribute("title") is None
+    assert [link.get_attribute("href") for link in card.find_elements(By.TAG_NAME, "a")] == ["/news/1", "/news/2"]
+    assert page.find_element(By.CSS_SELECTOR, ".card.big a:nth-of-type(2)").text == "Two"
+    assert page.find_elements(By.CLASS_NAME, "missing") == []
+    with pytest.raises(NoSuchElementException):
+        page.find_element(By.CLASS_NAME, "missing")
+
+
+@pytest.mark.parametrize("by", [By.XPATH, By.LINK_TEXT, By.NAME])
+def test_unsupported_locator(by):
+    page = HtmlPage("<p>Text</p>")
+    with pytest.raises(ValueError):
+        page.find_element(by, "p")
+    with pytest.raises(ValueError):
+        page.find_elements(by, "p")
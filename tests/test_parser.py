@@ -0,0 +1,170 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional
+
+from selenium.common.exceptions import WebDriverException
+
+from parsers.archive import PageArchive
+from parsers.parser import DriverPool, HtmlPage, Parser
+from parsers.retry import FailureKind, PageFailure, RetryQueue
+
+
+LINKS_NUM = 100
+
+
+# Pages of the links served from memory, the first loads of some links fail as timeouts
+class FakeFetcher:
+    def __init__(self, failures):
+        self.failures = dict(failures)
+        self.loaded_links = []
+        self.lock = threading.Lock()
+        # Pages loaded before every load of the links with failures
+        self.loaded_nums = {link: [] for link in self.failures}
+
+    @contextmanager
+    def page(self, link: str):
+        with self.lock:
+            if link in self.loaded_nums:
+                self.loaded_nums[link].append(len(self.loaded_links))
+            if self.failures.get(link):
+                self.failures[link] -= 1
+                raise PageFailure(FailureKind.TIMEOUT, f"Timeout on {link}")
+            self.loaded_links.append(link)
+        yield HtmlPage(f"<p>Text of {link}</p>", link)
+
+    def close(self):
+        pass
+
+
+class FakeParser(Parser):
+    WORKERS_NUM = 2
+
+    def __init__(self, fetcher: Optional[FakeFetcher] = None):
+        super().__init__("https://news.test/")
+        self.fetcher = fetcher
+        self.show_progress = False
+
+    def create_fetcher(self):
+        return self.fetcher if self.fetcher is not None else super().create_fetcher()
+
+    def parse_news_page(self, page) -> tuple:
+        return page.find_element("css selector", "p").text,
+
+
+def create_links(links_num: int):
+    return [f"https://news.test/news/{i}" for i in range(links_num)]
+
+
+def test_parse_news_pages_in_order_of_links():
+    links = create_links(LINKS_NUM)
+    parser = FakeParser(FakeFetcher(dict()))
+    pages = list(parser.parse_news_pages(iter(links), LINKS_NUM))
+    assert pages == [(f"Text of {link}", ) for link in links]
+
+
+def test_head_page_retry_doesnt_stop_workers(monkeypatch):
+    monkeypatch.setattr(RetryQueue, "BACKOFF_DELAY", 0.2)
+    links = create_links(LINKS_NUM)
+    fetcher = FakeFetcher({links[0]: 2})
+    parser = FakeParser(fetcher)
+    start_time = time.monotonic()
+    pages = list(parser.parse_news_pages(iter(links), LINKS_NUM))
+    # The first page waits for its retries in the retry lane while the workers load all other pages
+    assert fetcher.loaded_nums[links[0]] == [0, LINKS_NUM - 1, LINKS_NUM - 1]
+    assert pages == [(f"Text of {link}", ) for link in links]
+    assert time.monotonic() - start_time < 2
+    assert parser.metrics.to_dict()["counters"]["retries"] == 2
+
+
+def test_replayed_page_failures_are_final(tmp_path):
+    links = create_links(10)
+    page_archive = PageArchive(str(tmp_path))
+    for i, link in enumerate(links):
+        page_archive.add_page("FakeParser", link, "<p></p>" if i == 3 else f"<p>Text of {link}</p>")
+    parser = FakeParser()
+    parser.replay_archive = page_archive
+    start_time = time.monotonic()
+    pages = list(parser.parse_news_pages(iter(links), len(links)))
+    # The empty archived page isn't retried after the backoff, it would be empty again
+    assert pages == [(f"Text of {link}", ) if i != 3 else None for i, link in enumerate(links)]
+    assert time.monotonic() - start_time < RetryQueue.BACKOFF_DELAY
+    assert "retries" not in parser.metrics.to_dict()["counters"]
+    page_archive.close()
+
+
+class FakeDriver:
+    def __init__(self, number: int):
+        self.number = number
+
+    def quit(self):
+        pass
+
+
+# The browser starts take `start_time` seconds, the starts with the numbers in `failures` fail
+class FakeDrivers:
+    def __init__(self, start_time: float = 0, failures=()):
+        self.start_time = start_time
+        self.failures = set(failures)
+        self.started_num = 0
+        self.lock = threading.Lock()
+
+    def create_driver(self):
+        with self.lock:
+            self.started_num += 1
+            number = self.started_num
+        time.sleep(self.start_time)
+        if number in self.failures:
+            raise WebDriverException(f"Driver {number} failed to start")
+        return FakeDriver(number)
+
+
+def test_driver_pool_starts_browsers_in_parallel():
+    drivers = FakeDrivers(start_time=0.3)
+    pool = DriverPool(drivers.create_driver, 4)
+
+    def use_driver(_):
+        with pool.driver() as driver:
+            time.sleep(0.05)
+            return driver.number
+
+    start_time = time.monotonic()
+    with ThreadPoolExecutor(4) as executor:
+        assert sorted(executor.map(use_driver, range(4))) == [1, 2, 3, 4]
+    assert time.monotonic() - start_time < 0.6
+    # The drivers are reused by the next pages
+    with ThreadPoolExecutor(4) as executor:
+        assert set(executor.map(use_driver, range(8))) <= {1, 2, 3, 4}
+    assert drivers.started_num == 4
+
+
+def test_driver_pool_wakes_waiting_thread_after_failed_replacement():
+    # The replacement of the crashed first driver fails to start
+    drivers = FakeDrivers(failures={2})
+    pool = DriverPool(drivers.create_driver, 1)
+    driver_taken = threading.Event()
+    errors, numbers = [], []
+
+    def crash_driver():
+        try:
+            with pool.driver():
+                driver_taken.set()
+                time.sleep(0.1)
+                raise WebDriverException("Browser crashed")
+        except WebDriverException as e:
+            errors.append(str(e))
+
+    def use_driver():
+        driver_taken.wait()
+        with pool.driver() as driver:
+            numbers.append(driver.number)
+
+    threads = [threading.Thread(target=crash_driver, daemon=True), threading.Thread(target=use_driver, daemon=True)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    # The waiting thread starts its own driver in the freed slot instead of waiting forever
+    assert numbers == [3]
+    assert errors == ["Message: Driver 2 failed to start\n"]